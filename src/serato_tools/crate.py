@@ -50,8 +50,10 @@ def main():
         print("\n".join(Crate.get_serato_crate_files()))
         sys.exit()
 
-    for crate_path in Crate.get_serato_crate_files(args.file_or_dir):
-        crate = Crate(crate_path)
+    from serato_tools.crate_collection import CrateCollection
+
+    crate_paths = [f for f in Crate.get_serato_crate_files(args.file_or_dir) if f.endswith(Crate.EXTENSION)]
+    for crate in CrateCollection(crate_paths, lazy=args.find_missing):
         if args.find_missing:
             crate.find_missing()
         elif args.list_tracks or args.filenames_only:
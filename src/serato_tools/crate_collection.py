@@ -0,0 +1,140 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+if __package__ is None:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from serato_tools.crate import Crate
+from serato_tools.smart_crate import SmartCrate
+from serato_tools.utils.crate_base import CrateBase
+from serato_tools.utils.file_scan import DirListingCache
+from serato_tools.utils import logger, SERATO_DIR
+
+T = TypeVar("T")
+
+
+class CrateCollection:
+    """
+    Crates and smart crates, loaded concurrently. Bulk operations run across all crates in a thread pool, and
+    `save()` only writes the crates that were modified.
+
+    Threads rather than processes: crate files are small, so loading them is mostly file I/O, as are the existence
+    checks of `find_missing()`, and the parsed crates do not have to be pickled back.
+    """
+
+    def __init__(
+        self,
+        files: Optional[Iterable[str]] = None,
+        serato_dir: str = SERATO_DIR,
+        lazy: bool = False,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        files: crate and smart crate files to load. Default: all of them in `serato_dir`.
+        lazy: passed to each crate, see `SeratoBinFile`.
+        max_workers: size of the thread pool. Default: see `ThreadPoolExecutor`.
+        """
+        self.max_workers = max_workers
+        if files is None:
+            files = CrateCollection.get_crate_files(serato_dir)
+        files = list(files)
+        self.crates: dict[str, CrateBase] = dict(
+            zip(files, self._map(lambda file: CrateCollection.load_crate(file, lazy=lazy), files))
+        )
+
+    @staticmethod
+    def get_crate_files(serato_dir: str = SERATO_DIR) -> list[str]:
+        files: list[str] = []
+        for crate_cls in (Crate, SmartCrate):
+            crate_dir = os.path.join(serato_dir, crate_cls.DIR)
+            if os.path.isdir(crate_dir):
+                files += [f for f in crate_cls.get_serato_crate_files(crate_dir) if f.endswith(crate_cls.EXTENSION)]
+        return files
+
+    @staticmethod
+    def load_crate(file: str, lazy: bool = False) -> CrateBase:
+        if file.endswith(Crate.EXTENSION):
+            return Crate(file, lazy=lazy)
+        if file.endswith(SmartCrate.EXTENSION):
+            return SmartCrate(file, lazy=lazy)
+        raise ValueError(f"not a crate file, should end with {Crate.EXTENSION} or {SmartCrate.EXTENSION}: {file}")
+
+    def _map(self, func: Callable[..., T], items: Iterable) -> list[T]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, items))
+
+    def __iter__(self) -> Iterator[CrateBase]:
+        return iter(self.crates.values())
+
+    def __len__(self) -> int:
+        return len(self.crates)
+
+    def get_modified(self) -> list[CrateBase]:
+        return [crate for crate in self if crate.modified]
+
+    def modify_tracks(self, func: Callable[[CrateBase.Track], CrateBase.Track]):
+        self._map(lambda crate: crate.modify_tracks(func), self)
+
+    def filter_tracks(self, func: Callable[[CrateBase.Track], bool]):
+        self._map(lambda crate: crate.filter_tracks(func), self)
+
+    def change_track_path(self, src: str, dest: str):
+        """Changes the path of the track `src` to `dest`, in every crate that contains it."""
+        self.change_track_paths({src: dest})
+
+    def change_track_paths(self, mapping: dict[str, str]):
+        """Same as `change_track_path`, for each `src: dest`. Each crate is re-encoded once."""
+        for dest in mapping.values():
+            if not os.path.exists(CrateBase.get_full_path(dest)):
+                raise FileNotFoundError(f"file does not exist: {dest}")
+
+        def change_track_paths(crate: CrateBase):
+            with crate.batch():
+                for src, dest in mapping.items():
+                    crate.change_track_path(src, dest)
+
+        self._map(change_track_paths, self)
+
+    def remove_track(self, filepath: str):
+        self._map(lambda crate: crate.remove_track(filepath), self)
+
+    def rewrite_track_paths(self, func: Callable[[str], str]):
+        """
+        Sets the path of every track to `func(path)`. `path` is relative to the drive, like `CrateBase.Track.relpath`.
+        The returned path may be either.
+        """
+
+        def rewrite_track_path(track: CrateBase.Track) -> CrateBase.Track:
+            new_path = func(track.relpath)
+            if CrateBase.get_relative_path(new_path) != track.relpath:
+                track.set_path(new_path)
+            return track
+
+        self.modify_tracks(rewrite_track_path)
+
+    def find_missing(self) -> dict[str, list[str]]:
+        """
+        Returns the full paths of the track files that do not exist, by crate file. Unlike `CrateBase.find_missing`,
+        this does not prompt for new locations. Each directory is only listed once (see `DirListingCache`), however
+        many crates its files are in.
+        """
+        track_paths = dict(zip(self.crates, self._map(lambda crate: crate.get_track_paths(include_drive=True), self)))
+        exists = DirListingCache(max_workers=self.max_workers).check(
+            {path for paths in track_paths.values() for path in paths}
+        )
+        missing = {path for path, found in exists.items() if not found}
+        return {
+            file: [path for path in paths if path in missing]
+            for file, paths in track_paths.items()
+            if any(path in missing for path in paths)
+        }
+
+    def save(self) -> list[str]:
+        """Saves the crates that were modified. Returns their files."""
+        modified = self.get_modified()
+        self._map(lambda crate: crate.save(), modified)
+        for crate in modified:
+            logger.info(f"saved crate {crate.filepath}")
+        return [crate.filepath for crate in modified]
@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import uuid
+from typing import Optional, TypedDict
+
+if __package__ is None:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from serato_tools.crate_collection import CrateCollection
+from serato_tools.utils.crate_base import CrateBase
+from serato_tools.utils import logger, SERATO_DIR
+
+
+class CrateIndex:
+    """
+    Which crates contain each track, so that finding the crates of a track does not mean parsing every crate.
+
+    Cached in a JSON file. On load, only the crates whose size or modification time changed since are read again.
+    """
+
+    VERSION = 1
+    CACHE_FILENAME = ".serato_tools_crate_index.json"
+
+    class CrateInfo(TypedDict):
+        mtime_ns: int
+        size: int
+        tracks: list[str]
+
+    def __init__(
+        self,
+        serato_dir: str = SERATO_DIR,
+        cache: bool = True,
+        cache_file: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        cache: read and write the index from/to `cache_file`.
+        cache_file: default: `CACHE_FILENAME` in `serato_dir`.
+        max_workers: used to read changed crates, see `CrateCollection`.
+        """
+        self.serato_dir = serato_dir
+        self.cache_file = (cache_file or os.path.join(serato_dir, CrateIndex.CACHE_FILENAME)) if cache else None
+        self.max_workers = max_workers
+
+        self._crates: dict[str, CrateIndex.CrateInfo] = self._load_cache()
+        self._tracks: dict[str, set[str]] = {}
+        """ track key -> crate files """
+        self._changed = False
+
+        self.refresh()
+
+    def _load_cache(self) -> dict[str, "CrateIndex.CrateInfo"]:
+        if self.cache_file is None or not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CrateIndex.VERSION:
+                return data["crates"]
+        except (ValueError, KeyError, AttributeError) as e:
+            logger.warning(f"ignoring invalid crate index {self.cache_file}: {e}")
+        return {}
+
+    @staticmethod
+    def _get_track_key(track_path: str) -> str:
+        return CrateBase._get_track_key(CrateBase.get_relative_path(track_path))  # pylint: disable=protected-access
+
+    def refresh(self):
+        """Re-reads the crates that were added or changed since, and drops the ones that were deleted."""
+        files = [os.path.abspath(file) for file in CrateCollection.get_crate_files(self.serato_dir)]
+        stats = {file: os.stat(file) for file in files}
+
+        for file in set(self._crates) - set(files):
+            del self._crates[file]
+            self._changed = True
+
+        stale = [
+            file
+            for file in files
+            if file not in self._crates
+            or self._crates[file]["mtime_ns"] != stats[file].st_mtime_ns
+            or self._crates[file]["size"] != stats[file].st_size
+        ]
+        if stale:
+            logger.info(f"indexing {len(stale)} crates")
+            crates = CrateCollection(stale, lazy=True, max_workers=self.max_workers)
+            for file, crate in crates.crates.items():
+                self._crates[file] = {
+                    "mtime_ns": stats[file].st_mtime_ns,
+                    "size": stats[file].st_size,
+                    "tracks": crate.get_track_paths(),
+                }
+            self._changed = True
+
+        self._tracks = {}
+        for file, info in self._crates.items():
+            for track_path in info["tracks"]:
+                self._tracks.setdefault(CrateIndex._get_track_key(track_path), set()).add(file)
+
+        self.save()
+
+    def get_crate_files(self, track_path: str) -> list[str]:
+        """Crate and smart crate files that contain `track_path`. Not case-sensitive."""
+        return sorted(self._tracks.get(CrateIndex._get_track_key(track_path), []))
+
+    def update(self, crate: CrateBase):
+        """Records the current tracks of `crate`, which must have been saved to its file."""
+        file = crate.filepath
+        for track_path in self._crates.get(file, {"tracks": []})["tracks"]:
+            self._tracks.get(CrateIndex._get_track_key(track_path), set()).discard(file)
+
+        stat = os.stat(file)
+        track_paths = crate.get_track_paths()
+        self._crates[file] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "tracks": track_paths}
+        for track_path in track_paths:
+            self._tracks.setdefault(CrateIndex._get_track_key(track_path), set()).add(file)
+        self._changed = True
+
+    def save(self):
+        if self.cache_file is None or not self._changed:
+            return
+        temp_file = f"{self.cache_file}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"version": CrateIndex.VERSION, "crates": self._crates}, f)
+        os.replace(temp_file, self.cache_file)
+        self._changed = False
@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import os
+import re
 import sys
+from typing import Callable, Generator, Iterable, Optional, TypedDict
 
 if __package__ is None:
     sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
 from serato_tools.utils.bin_file_base import SeratoBinFile
-from serato_tools.utils import logger, SERATO_DIR
+from serato_tools.utils.bin_file_diff import BinFileDiff
+from serato_tools.utils.file_scan import RelocationIndex
+from serato_tools.utils.track_table import TrackTable
+from serato_tools.utils import logger, SERATO_DIR, PARSE_CACHE_DIR
 
 
 class DatabaseV2(SeratoBinFile):
@@ -19,32 +24,277 @@ class DatabaseV2(SeratoBinFile):
         (SeratoBinFile.Fields.VERSION, "2.0/Serato Scratch LIVE Database"),
     ]
 
-    def __init__(self, file: str = DEFAULT_DATABASE_FILE):
+    def __init__(self, file: str = DEFAULT_DATABASE_FILE, lazy: bool = False, cache_dir: Optional[str] = PARSE_CACHE_DIR):
         if not os.path.exists(file):
             raise FileNotFoundError(f"file does not exist: {file}")
-        super().__init__(file=file)
+        super().__init__(file=file, lazy=lazy, cache_dir=cache_dir)
+
+    @staticmethod
+    def iter_tracks(file: str = DEFAULT_DATABASE_FILE) -> Generator[SeratoBinFile.Track, None, None]:
+        """
+        Yields the tracks of the database `file` in constant memory, without loading the whole database. See
+        `iter_file_tracks`.
+        """
+        return DatabaseV2.iter_file_tracks(file)
+
+    @staticmethod
+    def transform(
+        src: str = DEFAULT_DATABASE_FILE,
+        dest: Optional[str] = None,
+        filter_func: Optional[Callable[[SeratoBinFile.Track], bool]] = None,
+        modify_func: Optional[Callable[[SeratoBinFile.Track], SeratoBinFile.Track]] = None,
+    ) -> int:
+        """Filters and modifies the tracks of the database `src` in constant memory. See `transform_file`."""
+        return DatabaseV2.transform_file(src, dest, filter_func=filter_func, modify_func=modify_func)
+
+    @staticmethod
+    def diff(old_file: str, new_file: str = DEFAULT_DATABASE_FILE) -> BinFileDiff:
+        """
+        The tracks added, removed and changed from `old_file` to `new_file` (i.e. a backup and the current database),
+        keyed by file path. See `BinFileDiff`.
+        """
+        return BinFileDiff.from_files(DatabaseV2, old_file, new_file)
+
+    def get_track_table(self, fields: Iterable[str]) -> TrackTable:
+        """Columnar view of `fields` of all tracks, see `TrackTable`."""
+        return TrackTable.from_file(self, fields)
+
+    class RenameResult(TypedDict):
+        dest: str
+        error: str | None
+        """ None if renamed """
 
     def rename_track_file(self, src: str, dest: str):
         """
         This renames the file path, and also changes the path in the database to point to the new filename, so that
         the renamed file is not missing in the library.
         """
+        self.rename_track_files({src: dest})
+
+    def rename_track_files(self, mapping: dict[str, str]) -> dict[str, RenameResult]:
+        """
+        Same as `rename_track_file`, for each `src: dest`. All files are renamed first, and then the database and each
+        crate that contains a renamed track are written once.
+
+        Returns the result for each `src`. Tracks that failed to rename are left unchanged in the library.
+        """
+        results: dict[str, DatabaseV2.RenameResult] = {}
+        renamed: dict[str, str] = {}
+        for src, dest in mapping.items():
+            try:
+                os.rename(src=src, dst=dest)
+                logger.info(f"renamed {src} to {dest}")
+            except FileExistsError:
+                # can't just do os.path.exists, doesn't pick up case changes for certain filesystems
+                logger.error(f"File already exists with change: {src}")
+                results[src] = {"dest": dest, "error": "file already exists"}
+                continue
+            except OSError as e:
+                logger.error(f"could not rename {src}: {e}")
+                results[src] = {"dest": dest, "error": str(e)}
+                continue
+            renamed[src] = dest
+            results[src] = {"dest": dest, "error": None}
+
+        if not renamed:
+            return results
+
+        with self.batch(save=True):
+            for src, dest in renamed.items():
+                self.change_track_path(src, dest)
+
+        from serato_tools.crate_collection import CrateCollection
+        from serato_tools.crate_index import CrateIndex
+
+        crate_index = CrateIndex(serato_dir=os.path.dirname(self.filepath))
+        crates = CrateCollection(sorted({file for src in renamed for file in crate_index.get_crate_files(src)}))
+        crates.change_track_paths(renamed)
+        crates.save()
+        for crate in crates:
+            crate_index.update(crate)
+        crate_index.save()
+
+        return results
+
+    class RelinkReport(TypedDict):
+        relinked: dict[str, str]
+        """ relative path of each missing track that was found -> its new location """
+        ambiguous: dict[str, list[str]]
+        """ relative path -> the files it may have moved to. Not relinked. """
+        not_found: list[str]
+
+    SIZE_TOLERANCE = 0.05
+    """ the size field is rounded, i.e. "8.6MB" """
+
+    @staticmethod
+    def _parse_track_size(value: SeratoBinFile.ValueOrNone) -> int | None:
+        match = re.fullmatch(r"\s*([\d.]+)\s*([KMG]?B)\s*", value, re.IGNORECASE) if isinstance(value, str) else None
+        if match is None:
+            return None
         try:
-            os.rename(src=src, dst=dest)
-            logger.info(f"renamed {src} to {dest}")
-        except FileExistsError:
-            # can't just do os.path.exists, doesn't pick up case changes for certain filesystems
-            logger.error(f"File already exists with change: {src}")
-            return
-        self.change_track_path(src, dest)
-        self.save()
+            return int(float(match[1]) * 1024 ** "BKMG".index(match[2][0].upper()))
+        except ValueError:
+            return None
 
-        from serato_tools.crate import Crate
+    def relink_missing(
+        self,
+        search_roots: Iterable[str],
+        crates: bool = True,
+        hash_files: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> RelinkReport:
+        """
+        Finds the new location of every missing track under `search_roots`, and relinks them all at once: the database
+        is written once, and so is each crate that contains a relinked track. Does not prompt.
+
+        A track is only relinked if there is a single match for it, see `RelocationIndex.match`. The size of the track,
+        if in the database, is used to tell apart files with the same name.
+
+        crates: also relink the missing tracks of the crates (in the database's directory) that are not in the database.
+        hash_files: treat files with the same name and content as copies, see `RelocationIndex`.
+        """
+        missing = dict.fromkeys(self.scan_missing(max_workers=max_workers)["missing"])
+        for track in self._iter_tracks():
+            if track.relpath in missing:
+                missing[track.relpath] = DatabaseV2._parse_track_size(getattr(track, DatabaseV2.Fields.SIZE, None))
+
+        crate_collection = None
+        if crates:
+            from serato_tools.crate_collection import CrateCollection
+
+            crate_collection = CrateCollection(serato_dir=os.path.dirname(self.filepath), max_workers=max_workers)
+            for paths in crate_collection.find_missing().values():
+                for path in paths:
+                    missing.setdefault(DatabaseV2.get_relative_path(path), None)
 
-        for crate_path in Crate.get_serato_crate_files():
-            crate = Crate(crate_path)
-            crate.change_track_path(src, dest)
-            crate.save()
+        report: DatabaseV2.RelinkReport = {"relinked": {}, "ambiguous": {}, "not_found": []}
+        if not missing:
+            return report
+
+        index = RelocationIndex(search_roots, hash_files=hash_files, max_workers=max_workers)
+        for relpath, size in missing.items():
+            matches = index.match(relpath, size=size, size_tolerance=DatabaseV2.SIZE_TOLERANCE)
+            if len(matches) == 1:
+                report["relinked"][relpath] = matches[0]
+            elif matches:
+                report["ambiguous"][relpath] = matches
+            else:
+                report["not_found"].append(relpath)
+        logger.info(
+            f"relinking {len(report['relinked'])} of {len(missing)} missing tracks, {len(report['ambiguous'])} ambiguous"
+        )
+
+        if report["relinked"]:
+            with self.batch(save=True):
+                for relpath, dest in report["relinked"].items():
+                    self.change_track_path(relpath, dest)
+            if crate_collection is not None:
+                crate_collection.change_track_paths(report["relinked"])
+                crate_collection.save()
+        return report
+
+    LIBRARY_FIELDS: frozenset[str] = frozenset(
+        {
+            SeratoBinFile.Fields.FILE_TYPE,
+            SeratoBinFile.Fields.FILE_PATH,
+            SeratoBinFile.Fields.TITLE,
+            SeratoBinFile.Fields.ARTIST,
+            SeratoBinFile.Fields.ALBUM,
+            SeratoBinFile.Fields.GENRE,
+            SeratoBinFile.Fields.LENGTH,
+            SeratoBinFile.Fields.BITRATE,
+            SeratoBinFile.Fields.SAMPLE_RATE,
+            SeratoBinFile.Fields.SIZE,
+            SeratoBinFile.Fields.BPM,
+            SeratoBinFile.Fields.KEY,
+            SeratoBinFile.Fields.GROUPING,
+            SeratoBinFile.Fields.PUBLISHER,
+            SeratoBinFile.Fields.COMPOSER,
+            SeratoBinFile.Fields.YEAR,
+            SeratoBinFile.Fields.HAS_STEMS,
+        }
+    )
+    """
+    Fields of a track that describe its file (path, format, tags), as opposed to the state that Serato keeps for the
+    track in each library (i.e. played, date added, beatgrid locked, and any field not known here).
+    """
+
+    class MergeReport(TypedDict):
+        updated: int
+        added: int
+        removed: int
+
+    def merge(
+        self, other: "DatabaseV2", fields: Iterable[str] = LIBRARY_FIELDS, remove_others: bool = True
+    ) -> MergeReport:
+        """
+        Merges the tracks of `other` into this database, keeping everything else this database has on each track, in a
+        single pass over its tracks. I.e. to update the database of an exported drive, without losing what Serato
+        wrote to it since.
+
+        Each track of `other` is matched by file path (not case-sensitive), or else by filename. Of a matched track,
+        only `fields` are taken from `other`: set if `other` has them, removed if not. The tracks of `other` that do
+        not match are added.
+
+        remove_others: remove the tracks that are not in `other`.
+        """
+        get_key = SeratoBinFile._get_track_key
+        fields = frozenset(fields)
+        new_tracks: dict[str, SeratoBinFile.EntryList] = {}
+        for track in other._iter_tracks():  # pylint: disable=protected-access
+            new_tracks.setdefault(get_key(track.relpath), track.to_entries())
+
+        # the tracks that do not match by path, by filename, for those that are the only one with that filename
+        path_keys = self._get_track_index()
+        by_filename: dict[str, str | None] = {}
+        for key in new_tracks:
+            if key not in path_keys:
+                filename = os.path.basename(key).casefold()
+                by_filename[filename] = None if filename in by_filename else key
+
+        matched: dict[str, str] = {}  # key of a track of this database -> key of its match in `other`
+        claimed: set[str] = set()
+        report: DatabaseV2.MergeReport = {"updated": 0, "added": 0, "removed": 0}
+
+        def filter_track(track: SeratoBinFile.Track) -> bool:
+            key = get_key(track.relpath)
+            new_key = key if key in new_tracks else by_filename.get(os.path.basename(key).casefold())
+            if new_key is None or new_key in claimed:
+                if remove_others:
+                    report["removed"] += 1
+                return not remove_others
+            claimed.add(new_key)
+            matched[key] = new_key
+            return True
+
+        def modify_track(track: SeratoBinFile.Track) -> SeratoBinFile.Track:
+            new_key = matched.get(get_key(track.relpath))
+            if new_key is None:
+                return track
+            new_entries = new_tracks[new_key]
+            new_values = dict(new_entries)
+            old_entries = track.to_entries()
+            entries = [
+                (field, new_values[field] if field in fields else value)
+                for field, value in old_entries
+                if field not in fields or field in new_values
+            ]
+            present = {field for field, _ in entries}
+            entries += [(field, value) for field, value in new_entries if field in fields and field not in present]
+            if entries == old_entries:
+                return track
+            report["updated"] += 1
+            return DatabaseV2.Track(entries, path_key=DatabaseV2.TRACK_PATH_KEY)
+
+        with self.batch():
+            self.filter_tracks(filter_track)
+            self.modify_tracks(modify_track)
+            self._apply_pending_track_ops()  # i.e. fills `claimed`
+            for key, entries in new_tracks.items():
+                if key not in claimed:
+                    self._append_track(list(entries))
+                    report["added"] += 1
+        return report
 
 
 if __name__ == "__main__":
@@ -53,12 +303,39 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("file", nargs="?", default=DatabaseV2.DEFAULT_DATABASE_FILE)
     parser.add_argument("--find_missing", action="store_true", help="List files that do not exist")
+    parser.add_argument(
+        "--search_dirs", nargs="+", default=None, help="With --find_missing, look for missing files in these dirs"
+    )
+    parser.add_argument(
+        "--relink", nargs="+", metavar="SEARCH_DIR", help="Relink all missing tracks to files found in these dirs"
+    )
+    parser.add_argument("--diff", metavar="OLD_FILE", help="List the tracks changed since OLD_FILE, i.e. a backup")
+    parser.add_argument("--write_patch", metavar="PATCH_FILE", help="With --diff, also write the changes to PATCH_FILE")
+    parser.add_argument("--apply_patch", metavar="PATCH_FILE", help="Apply the changes in PATCH_FILE, and save")
     args = parser.parse_args()
 
-    db = DatabaseV2(args.file)
+    if args.diff:
+        diff = DatabaseV2.diff(args.diff, args.file)
+        print(diff)
+        if args.write_patch:
+            diff.write_patch(args.write_patch)
+        sys.exit()
+
+    db = DatabaseV2(args.file, lazy=args.find_missing)
 
-    if args.find_missing:
+    if args.relink:
+        relink_report = db.relink_missing(args.relink)
+        for relpath, dest in relink_report["relinked"].items():
+            print(f"relinked: {relpath} -> {dest}")
+        for relpath, candidates in relink_report["ambiguous"].items():
+            print(f"ambiguous: {relpath}, could be: {', '.join(candidates)}")
+        for relpath in relink_report["not_found"]:
+            print(f"not found: {relpath}")
+    elif args.apply_patch:
+        BinFileDiff.read_patch(args.apply_patch).apply(db)
+        db.save()
+    elif args.find_missing:
         # TODO: actually look for that missing flag.
-        db.find_missing()
+        db.find_missing(args.search_dirs)
     else:
         print(db)
@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import cast
+from typing import Iterable, Optional, cast
 from enum import StrEnum, IntEnum
 
 if __package__ is None:
@@ -150,7 +150,8 @@ class SmartCrate(CrateBase):
         rule_field_id = field.value
         rule_exists: bool = False
         new_entries: SmartCrate.EntryList = []
-        for f, v in self.entries:  # pylint: disable=access-member-before-definition
+        for entry in self.entries:
+            f, v = entry
             if f == CrateBase.Fields.SMARTCRATE_RULE:
                 if not isinstance(v, list):
                     raise DataTypeError(v, list, f)
@@ -159,8 +160,9 @@ class SmartCrate(CrateBase):
                     rule.set_value(value)
                     rule.set_comparison(comparison)
                     rule_exists = True
-                v = rule.to_entries()
-            new_entries.append((f, v))
+                if rule.modified:
+                    entry = (f, rule.to_entries())
+            new_entries.append(entry)
 
         if not rule_exists:
             new_rule = SmartCrate.Rule(
@@ -178,19 +180,20 @@ class SmartCrate(CrateBase):
     def delete_rule(self, field: "SmartCrate.RuleField"):
         rule_field_id = field.value
         new_entries: SmartCrate.EntryList = []
-        for f, v in self.entries:  # pylint: disable=access-member-before-definition
+        for entry in self.entries:
+            f, v = entry
             if f == CrateBase.Fields.SMARTCRATE_RULE:
                 if not isinstance(v, list):
                     raise DataTypeError(v, list, f)
                 rule = SmartCrate.Rule(v)
                 if rule.field == rule_field_id:
                     continue
-            new_entries.append((f, v))
+            new_entries.append(entry)
 
         self.entries = new_entries  # pylint: disable=attribute-defined-outside-init
         self._dump()
 
-    def find_missing(self):
+    def find_missing(self, search_roots: Optional[Iterable[str]] = None):  # pylint: disable=unused-argument
         raise Exception("cannot be done on smart crate")
 
 
@@ -219,8 +222,11 @@ def main():
 
     set_rules = parse_cli_keys_and_values(args.set_rules) if args.set_rules else {}
 
-    for crate_path in SmartCrate.get_serato_crate_files(args.file_or_dir):
-        crate = SmartCrate(crate_path)
+    from serato_tools.crate_collection import CrateCollection
+
+    crate_paths = [f for f in SmartCrate.get_serato_crate_files(args.file_or_dir) if f.endswith(SmartCrate.EXTENSION)]
+    for crate in CrateCollection(crate_paths):
+        assert isinstance(crate, SmartCrate)
 
         if args.set_rules:
             for key, value in set_rules.items():
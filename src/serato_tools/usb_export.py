@@ -1,11 +1,10 @@
 import sys
 import os
-import filecmp
 import shutil
 import glob
 import re
 import platform
-from typing import Optional, cast
+from typing import Callable, Optional, TypedDict, cast
 
 
 if __package__ is None:
@@ -14,6 +13,11 @@ if __package__ is None:
 from serato_tools.database_v2 import DatabaseV2
 from serato_tools.crate import Crate
 from serato_tools.smart_crate import SmartCrate
+from serato_tools.crate_collection import CrateCollection
+from serato_tools.utils.bin_file_base import SeratoBinFile
+from serato_tools.utils.export_manifest import ExportManifest
+from serato_tools.utils.file_copy import CopyResult, FileCopier
+from serato_tools.utils.file_scan import DirListingCache
 from serato_tools.utils import (
     logger,
     SERATO_DIR_NAME,
@@ -24,172 +28,348 @@ from serato_tools.utils import (
 # TODO: put in folders if there are different locations locally for the same basename
 
 
-def _uniq_by_basename(paths: list[str]):
-    basenames: list[str] = []
-    return_paths: list[str] = []
-    for path in paths:
-        basename = os.path.basename(path)
-        if basename not in basenames:
-            basenames.append(basename)
-            return_paths.append(path)
-    return return_paths
+class ExportPlan:
+    """
+    Everything an export writes to a drive, worked out before anything is written: the crates, the database, the
+    order file and the files to copy. Paths on the drive are relative to it, so a plan does not depend on the drive.
 
+    Built in a single pass over each crate, over the database and over the stems crate: the exported tracks are kept
+    in a dict by filename, so checking whether a track is exported is a lookup, and each file is re-encoded once.
+    """
 
-def copy_crates_to_usb(
-    crate_files: list[str], dest_drive_dir: str, dest_tracks_dir: str, root_crate: Optional[str] = None
-):
-    if not os.path.isdir(dest_drive_dir):
-        logger.error(f"destination drive directory does not exist: {dest_drive_dir}")
-
-    DEST_SERATO_DIR = os.path.join(dest_drive_dir, SERATO_DIR_NAME)
-
-    # TODO: merge with existing, instead of replacing
-    if os.path.isdir(DEST_SERATO_DIR):
-        shutil.rmtree(DEST_SERATO_DIR)
-
-    # copy the crate files, and get the filenames from them
-    tracks_to_copy: list[str] = []
-
-    crate_dir = os.path.join(DEST_SERATO_DIR, Crate.DIR)
-    os.makedirs(crate_dir, exist_ok=True)
-
-    def change_track_path(track_path: str):
-        return Crate.get_relative_path(os.path.join(dest_tracks_dir, os.path.basename(track_path)))
-
-    def modify_crate_track(track: Crate.Track) -> Crate.Track:
-        tracks_to_copy.append(track.relpath)
-        track.set_path(change_track_path(track.relpath))
-        return track
-
-    for crate_file in crate_files:
-        if os.path.isdir(crate_file):
-            continue
-        elif crate_file.endswith(Crate.EXTENSION):
-            crate = Crate(crate_file)
-        elif crate_file.endswith(SmartCrate.EXTENSION):
-            crate = SmartCrate(crate_file)
-        else:
-            raise ValueError(
-                f"not a crate file, should end with {Crate.EXTENSION} or {SmartCrate.EXTENSION}: {crate_file}"
-            )
-
-        crate.modify_tracks(modify_crate_track)
-        crate.remove_duplicates()
-
-        crate_filename = os.path.basename(crate_file)
-        if root_crate is not None:
-            crate_filename = root_crate + "%%" + crate_filename
-        new_crate_file = os.path.join(crate_dir, crate_filename)
-        crate.save(new_crate_file)
-
-        # need to just save smartCrates as a .crate instead of a .scrate, can't do smart crate on USB.
-        if isinstance(crate, SmartCrate):
-            existing = new_crate_file
-            new = existing.replace("≫≫", "%%").replace(SmartCrate.EXTENSION, Crate.EXTENSION)
-            os.replace(existing, new)
-            new_crate_file = new
-        logger.info(f"copied crate {new_crate_file}")
-
-    # create the db file
-    db = DatabaseV2()
-    tracks_to_copy = [os.path.normpath(f) for f in tracks_to_copy]
-    tracks_to_copy = _uniq_by_basename(tracks_to_copy)
-    tracks_to_copy_basenames = [os.path.basename(f) for f in tracks_to_copy]
-
-    def modify_db_track(track: DatabaseV2.Track) -> DatabaseV2.Track:
-        track.set_path(os.path.join(dest_tracks_dir, os.path.basename(track.relpath)))
-        track.set_value(DatabaseV2.Fields.PLAYED, False)
-        return track
-
-    db.filter_tracks(lambda track: os.path.basename(track.relpath) in tracks_to_copy_basenames)
-    db.modify_tracks(modify_db_track)
-    db.remove_duplicates()
-
-    new_db_file = os.path.join(DEST_SERATO_DIR, DatabaseV2.FILENAME)
-    db.save(new_db_file)
-    logger.info(f"created database file {new_db_file}")
-
-    # copy crate order file, modify if needed
     NEW_ORDER_FILE = "neworder.pref"
-    with open(os.path.join(LOCAL_SERATO_DIR, NEW_ORDER_FILE), "r", encoding="utf-8") as f:
-        lines = f.read().splitlines()
-
-    if root_crate:
-        CRATE_KEY = "[crate]"
-        new_lines = []
-        for line in lines:
-            if line.startswith(CRATE_KEY):
-                value = line[len(CRATE_KEY) :]
-                if value != "Stems":
-                    line = f"{CRATE_KEY}{root_crate}%%{value}"
-            new_lines.append(line)
-        lines = new_lines
-
-    DEST_NEW_ORDER_FILEPATH = os.path.join(DEST_SERATO_DIR, NEW_ORDER_FILE)
-    with open(DEST_NEW_ORDER_FILEPATH, "w", encoding="utf-8") as f:
-        f.writelines(lines)
-        logger.info(f"copied order file {DEST_NEW_ORDER_FILEPATH}")
-
-    # copy stems crate
-    LOCAL_STEMS_CRATE = os.path.join(LOCAL_SERATO_DIR, Crate.SERATO_STEMS_CRATE_PATH)
-    if os.path.exists(LOCAL_STEMS_CRATE):
-        DEST_STEMS_CRATE = os.path.join(DEST_SERATO_DIR, Crate.SERATO_STEMS_CRATE_PATH)
-        os.makedirs(os.path.dirname(DEST_STEMS_CRATE), exist_ok=True)
+    DB_FILE = os.path.join(SERATO_DIR_NAME, DatabaseV2.FILENAME)
+
+    class Changes(TypedDict):
+        """What an export changes on a drive, see `get_changes`."""
+
+        write: dict[str, bytes]
+        """ database, crate and order files that changed -> their data """
+        copy: list[tuple[str, str]]
+        """ (source, destination) of the files that are not on the drive yet, or changed """
+        copy_bytes: int
+        unchanged: list[tuple[str, str]]
+        delete: list[str]
+        """ files of a previous export that are no longer exported """
+        not_found: list[str]
+        """ source files that do not exist """
+        stats: dict[str, os.stat_result]
+        """ source file -> its stat """
+
+    def __init__(
+        self,
+        crate_files: list[str],
+        dest_tracks_dir: str,
+        root_crate: Optional[str] = None,
+        serato_dir: str = LOCAL_SERATO_DIR,
+    ):
+        """
+        dest_tracks_dir: the directory on the drive to copy all tracks to, relative to it.
+        serato_dir: the local Serato folder, with the database, order file and stems crate to export.
+        """
+        self.dest_tracks_dir = dest_tracks_dir
+        self.serato_dir = serato_dir
+        self.tracks: dict[str, str] = {}
+        """ filename -> path of the exported track with that filename, relative to its drive """
+        self.crates: dict[str, bytes] = {}
+        """ path relative to the drive -> data """
+        self.files: list[tuple[str, str]] = []
+        """ (source, destination relative to the drive) of each track and stems file """
+
+        self._plan_crates(crate_files, root_crate)
+        self.db = self._plan_db()
+        self.order_file = self._plan_order_file(root_crate)
+        self._plan_stems_crate()
+        self._plan_files()
+
+    def _get_dest_path(self, track_path: str) -> str:
+        return Crate.get_relative_path(os.path.join(self.dest_tracks_dir, os.path.basename(track_path)))
+
+    def _plan_crates(self, crate_files: list[str], root_crate: Optional[str]):
+        def modify_crate_track(track: Crate.Track) -> Crate.Track:
+            relpath = os.path.normpath(track.relpath)
+            self.tracks.setdefault(os.path.basename(relpath), relpath)
+            track.set_path(self._get_dest_path(track.relpath))
+            return track
+
+        crates = CrateCollection([f for f in crate_files if not os.path.isdir(f)])
+        for crate_file, crate in crates.crates.items():
+            with crate.batch():
+                crate.modify_tracks(modify_crate_track)
+                crate.remove_duplicates()
+
+            crate_filename = os.path.basename(crate_file)
+            if root_crate is not None:
+                crate_filename = root_crate + "%%" + crate_filename
+            # need to just save smartCrates as a .crate instead of a .scrate, can't do smart crate on USB.
+            if isinstance(crate, SmartCrate):
+                crate_filename = crate_filename.replace("≫≫", "%%").replace(SmartCrate.EXTENSION, Crate.EXTENSION)
+            self.crates[os.path.join(SERATO_DIR_NAME, Crate.DIR, crate_filename)] = crate.to_bytes()
+
+    def _filter_exported(self) -> Callable[[SeratoBinFile.Track], bool]:
+        """Filter for the tracks that are exported, the first one of each filename only."""
+        seen: set[str] = set()
+
+        def filter_track(track: SeratoBinFile.Track) -> bool:
+            filename = os.path.basename(track.relpath)
+            if filename not in self.tracks or filename in seen:
+                return False
+            seen.add(filename)
+            return True
+
+        return filter_track
+
+    def _plan_db(self) -> DatabaseV2:
+        # lazy: the filter then only fully decodes the exported tracks
+        db = DatabaseV2(os.path.join(self.serato_dir, DatabaseV2.FILENAME), lazy=True)
+
+        def modify_db_track(track: DatabaseV2.Track) -> DatabaseV2.Track:
+            track.set_path(os.path.join(self.dest_tracks_dir, os.path.basename(track.relpath)))
+            track.set_value(DatabaseV2.Fields.PLAYED, False)
+            return track
+
+        with db.batch():
+            db.filter_tracks(self._filter_exported())
+            db.modify_tracks(modify_db_track)
+        return db
+
+    def _plan_order_file(self, root_crate: Optional[str]) -> bytes:
+        """The crate order file, modified if needed."""
+        with open(os.path.join(self.serato_dir, ExportPlan.NEW_ORDER_FILE), "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+        if root_crate:
+            CRATE_KEY = "[crate]"
+            new_lines = []
+            for line in lines:
+                if line.startswith(CRATE_KEY):
+                    value = line[len(CRATE_KEY) :]
+                    if value != "Stems":
+                        line = f"{CRATE_KEY}{root_crate}%%{value}"
+                new_lines.append(line)
+            lines = new_lines
+        return "".join(lines).encode("utf-8")
+
+    def _plan_stems_crate(self):
+        LOCAL_STEMS_CRATE = os.path.join(self.serato_dir, Crate.SERATO_STEMS_CRATE_PATH)
+        if not os.path.exists(LOCAL_STEMS_CRATE):
+            return
         stems_crate = Crate(LOCAL_STEMS_CRATE)
 
         def modify_stems_crate_track(track: Crate.Track) -> Crate.Track:
-            track.set_path(change_track_path(track.relpath))
+            track.set_path(self._get_dest_path(track.relpath))
             return track
 
-        stems_crate.filter_tracks(lambda track: os.path.basename(track.relpath) in tracks_to_copy_basenames)
-        stems_crate.modify_tracks(modify_stems_crate_track)
-        stems_crate.remove_duplicates()
-        stems_crate.save(DEST_STEMS_CRATE)
-        logger.info(f"copied crate {DEST_STEMS_CRATE}")
-
-    # copy files
-    logger.info("copying files over...")
+        with stems_crate.batch():
+            stems_crate.filter_tracks(self._filter_exported())
+            stems_crate.modify_tracks(modify_stems_crate_track)
+        self.crates[os.path.join(SERATO_DIR_NAME, Crate.SERATO_STEMS_CRATE_PATH)] = stems_crate.to_bytes()
+
+    def _plan_files(self):
+        root = LOCAL_SERATO_DRIVE + os.sep if LOCAL_SERATO_DRIVE else os.sep
+        stem_files = StemFinder()
+        for relpath in self.tracks.values():
+            src_path = os.path.join(root, relpath)
+            self.files.append((src_path, os.path.join(self.dest_tracks_dir, os.path.basename(src_path))))
+            for stem_file in stem_files.find(src_path):
+                self.files.append((stem_file, os.path.join(self.dest_tracks_dir, os.path.basename(stem_file))))
+
+    def get_data_files(self, drive_db: Optional[DatabaseV2] = None) -> dict[str, bytes]:
+        """
+        The database, crate and order files to write, by path relative to the drive.
+
+        drive_db: the database on the drive, to merge the exported tracks into instead of replacing it. Modified.
+        """
+        if drive_db is not None:
+            merge_report = drive_db.merge(self.db)
+            logger.info(
+                f"merged into the database on the drive: {merge_report['updated']} tracks updated,"
+                f" {merge_report['added']} added, {merge_report['removed']} removed"
+            )
+        db_data = (drive_db or self.db).to_bytes()
+        order_file = os.path.join(SERATO_DIR_NAME, ExportPlan.NEW_ORDER_FILE)
+        return {**self.crates, ExportPlan.DB_FILE: db_data, order_file: self.order_file}
+
+    def get_changes(
+        self,
+        drive_dir: str,
+        manifest: ExportManifest,
+        data_files: dict[str, bytes],
+        hash_files: bool = False,
+    ) -> Changes:
+        """
+        Compares the plan with what is on the drive: with `manifest` (see `ExportManifest.is_unchanged`), or else
+        with the files themselves (see `FileCopier.is_same`). Reads the drive, does not write to it.
+
+        data_files: see `get_data_files`.
+        """
+        changes: ExportPlan.Changes = {
+            "write": {},
+            "copy": [],
+            "copy_bytes": 0,
+            "unchanged": [],
+            "delete": [],
+            "not_found": [],
+            "stats": {},
+        }
+        exported: set[str] = set()
+        for relpath, data in data_files.items():
+            path = os.path.join(drive_dir, relpath)
+            exported.add(path)
+            if not manifest.is_data_unchanged(path, data):
+                changes["write"][path] = data
+
+        dest_files = DirListingCache()  # one listing of the tracks directory, instead of a stat per file
+        for src, dest_relpath in self.files:
+            dest = os.path.join(drive_dir, dest_relpath)
+            # also when the source is missing (i.e. an unmounted drive), so that its copy is not deleted
+            exported.add(dest)
+            try:
+                stat = changes["stats"][src] = os.stat(src)
+            except OSError:
+                changes["not_found"].append(src)
+                continue
+            if dest_files.isfile(dest) and (
+                manifest.is_unchanged(src, dest, stat, hash_files=hash_files) or FileCopier.is_same(src, dest)
+            ):
+                changes["unchanged"].append((src, dest))
+            else:
+                changes["copy"].append((src, dest))
+                changes["copy_bytes"] += stat.st_size
+
+        changes["delete"] = manifest.get_stale(exported)
+        return changes
+
+    def describe(self, changes: Changes) -> str:
+        """The plan and its cost, for a dry run."""
+        lines = [f"write {path}" for path in changes["write"]]
+        lines += [f"copy {src} -> {dest}" for src, dest in changes["copy"]]
+        lines += [f"delete {path}" for path in changes["delete"]]
+        lines += [f"not found: {src}" for src in changes["not_found"]]
+        n_stems = len(self.files) - len(self.tracks)
+        lines.append(
+            f"{len(self.crates)} crates, {len(self.tracks)} tracks, {n_stems} stems files: "
+            f"write {len(changes['write'])} database, crate and order files, "
+            f"copy {len(changes['copy'])} files ({changes['copy_bytes'] / 1e6:,.0f} MB), "
+            f"{len(changes['unchanged'])} unchanged, delete {len(changes['delete'])}, "
+            f"{len(changes['not_found'])} not found"
+        )
+        return "\n".join(lines)
+
+
+class ExportTarget:
+    """A drive to export an `ExportPlan` to: what the plan changes on it, and making those changes."""
+
+    def __init__(
+        self,
+        plan: ExportPlan,
+        drive_dir: str,
+        incremental: bool = False,
+        hash_files: bool = False,
+        merge: bool = False,
+    ):
+        """See `copy_crates_to_usb`. Reads the drive, does not write to it."""
+        if not os.path.isdir(drive_dir):
+            logger.error(f"destination drive directory does not exist: {drive_dir}")
+        self.plan = plan
+        self.drive_dir = drive_dir
+        self.serato_dir = os.path.join(drive_dir, SERATO_DIR_NAME)
+        self.incremental = incremental
+        self.hash_files = hash_files
+
+        db_file = os.path.join(drive_dir, ExportPlan.DB_FILE)
+        drive_db = DatabaseV2(db_file) if merge and os.path.isfile(db_file) else None
+        self.data_files = plan.get_data_files(drive_db)
+        # written for every export, so that the next one can be incremental
+        self.manifest = ExportManifest(drive_dir, self.serato_dir, load=incremental)
+        self.changes = plan.get_changes(drive_dir, self.manifest, self.data_files, hash_files=hash_files)
+
+    def prepare(self):
+        """Writes the database, crate and order files, and deletes the files that are no longer exported."""
+        if not self.incremental and os.path.isdir(self.serato_dir):
+            shutil.rmtree(self.serato_dir)
+
+        for path, data in self.changes["write"].items():
+            self.manifest.write_data_file(path, data)
+            logger.info(f"copied {path}")
+        logger.info(f"{len(self.data_files) - len(self.changes['write'])} database, crate and order files unchanged")
+
+        for path in self.changes["delete"]:
+            if os.path.isfile(path):
+                os.remove(path)
+                logger.info(f"removed {path}")
+            self.manifest.remove(path)
+
+    def finish(self, result: CopyResult):
+        """Records the copied files in the manifest, once `changes["copy"]` are copied."""
+        srcs = {dest: src for src, dest in self.changes["copy"]}
+        for src, dest in self.changes["unchanged"] + [(srcs[dest], dest) for dest in result["copied"]]:
+            self.manifest.add_file(src, dest, self.changes["stats"][src], hash_files=self.hash_files)
+        self.manifest.save()
+        logger.info(
+            f"{self.drive_dir}: copied {len(result['copied'])} files ({result['copied_bytes'] / 1e6:,.0f} MB)"
+            f" in {result['seconds']:.1f}s, {len(self.changes['unchanged'])} unchanged"
+        )
+        if result["failed"]:
+            logger.error(f"{self.drive_dir}: {len(result['failed'])} files failed to copy")
 
-    root = LOCAL_SERATO_DRIVE + os.sep if LOCAL_SERATO_DRIVE else os.sep
-    tracks_to_copy = [os.path.join(root, t) for t in tracks_to_copy]
 
-    not_found: list[str] = []
+def copy_crates_to_usb(
+    crate_files: list[str],
+    dest_drive_dir: str | list[str],
+    dest_tracks_dir: str,
+    root_crate: Optional[str] = None,
+    max_workers: int = FileCopier.DEFAULT_WORKERS,
+    incremental: bool = False,
+    hash_files: bool = False,
+    merge: bool = False,
+    dry_run: bool = False,
+):
+    """
+    dest_drive_dir: one or more drives. The export is planned once, and each source file is read once for all drives,
+        see `FileCopier.copy_files_to_targets`.
+    max_workers: number of files copied at once, to a single drive.
+    incremental: update the previous export on the drive, instead of replacing it. Only the files whose source changed
+        since (see `ExportManifest`) are copied, the files that are no longer exported are deleted, and only the crates
+        that changed are rewritten.
+    hash_files: with `incremental`, compare the content of source files whose modification time changed but not their
+        size, instead of copying them again. Hashes each copied file.
+    merge: update the database on the drive with the exported tracks, instead of replacing it, so that what Serato
+        wrote to it (play history, date added, ...) is kept. See `DatabaseV2.merge`.
+    dry_run: print what would be written, copied and deleted (see `ExportPlan.describe`), without writing anything.
+    """
+    drive_dirs = list(dict.fromkeys([dest_drive_dir] if isinstance(dest_drive_dir, str) else dest_drive_dir))
+
+    plan = ExportPlan(crate_files, dest_tracks_dir, root_crate=root_crate)
+    targets = [ExportTarget(plan, d, incremental=incremental, hash_files=hash_files, merge=merge) for d in drive_dirs]
+
+    if dry_run:
+        for target in targets:
+            if len(targets) > 1:
+                print(f"{target.drive_dir}:")
+            print(plan.describe(target.changes))
+        return
 
-    def maybe_copy(src_path: str, dst_path: str):
-        if not os.path.exists(src_path):
-            not_found.append(src_path)
-            return
-        copy = (not filecmp.cmp(src_path, dst_path, shallow=True)) if os.path.exists(dst_path) else True
-        if copy:
-            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-            logger.info(f"copying {src_path}")
-            shutil.copy2(src_path, dst_path)
-
-    for index, src_path in enumerate(tracks_to_copy):
-        percent_complete = index / float(len(tracks_to_copy)) * 100
-        print(f"{percent_complete:.1f}%", end="\r", flush=True)
-        maybe_copy(
-            src_path=src_path,
-            dst_path=os.path.join(dest_drive_dir, dest_tracks_dir, os.path.basename(src_path)),
-        )
+    for target in targets:
+        target.prepare()
 
-        maybe_stem_files = glob.glob(os.path.splitext(src_path)[0] + "*.serato-stems")
-        if len(maybe_stem_files) > 1:
-            ERROR_STR = "should not have more than 1 stem file for: " + src_path
-            print(ERROR_STR)
-            print("Files found:")
-            print("\n".join(maybe_stem_files))
-            raise Exception(ERROR_STR)
-        if len(maybe_stem_files) == 1:
-            maybe_copy(
-                src_path=maybe_stem_files[0],
-                dst_path=os.path.join(dest_drive_dir, dest_tracks_dir, os.path.basename(maybe_stem_files[0])),
-            )
-    print("\n")
+    # copy files
+    logger.info("copying files over...")
+    copier = FileCopier(max_workers=max_workers)
+    if len(targets) == 1:
+        results = [copier.copy_files(targets[0].changes["copy"], skip_same=False)]
+    else:
+        by_drive = copier.copy_files_to_targets({target.drive_dir: target.changes["copy"] for target in targets})
+        results = [by_drive[target.drive_dir] for target in targets]
+    for target, result in zip(targets, results):
+        target.finish(result)
 
-    if len(not_found) == len(tracks_to_copy):
+    not_found: list[str] = []
+    for target, result in zip(targets, results):
+        not_found += [src for src in target.changes["not_found"] + result["not_found"] if src not in not_found]
+    if plan.files and len(not_found) == len(plan.files):
         logger.error("No source files found.")
-        uniq_dirs = list(set(os.path.dirname(d) for d in tracks_to_copy))
+        uniq_dirs = list(set(os.path.dirname(src) for src, _ in plan.files))
         logger.error(f"Directories: \n{"\n    ".join(uniq_dirs)}")
         return
 
@@ -197,6 +377,34 @@ def copy_crates_to_usb(
         logger.warning(f"ERROR: does not exist - {n}")
 
 
+class StemFinder:
+    """Finds the stems file of each track, listing each directory only once."""
+
+    EXTENSION = ".serato-stems"
+
+    def __init__(self):
+        self._stems: dict[str, list[str]] = {}
+        """ directory -> names of the stems files in it """
+
+    def find(self, track_path: str) -> list[str]:
+        """The stems file of `track_path` (named like it, i.e. "Track.serato-stems"), if there is one."""
+        dirpath, filename = os.path.split(track_path)
+        if dirpath not in self._stems:
+            try:
+                self._stems[dirpath] = [f for f in os.listdir(dirpath or ".") if f.endswith(StemFinder.EXTENSION)]
+            except OSError:
+                self._stems[dirpath] = []
+        stem = os.path.splitext(filename)[0]
+        stem_files = [os.path.join(dirpath, f) for f in self._stems[dirpath] if f.startswith(stem)]
+        if len(stem_files) > 1:
+            ERROR_STR = "should not have more than 1 stem file for: " + track_path
+            print(ERROR_STR)
+            print("Files found:")
+            print("\n".join(stem_files))
+            raise Exception(ERROR_STR)
+        return stem_files
+
+
 def get_crate_files(pattern: str):
     try:
         regex = re.compile(pattern)
@@ -233,10 +441,11 @@ def main():
         "-d",
         "--drive",
         "--drive_dir",
-        dest="dest_dir",
+        dest="dest_dirs",
+        nargs="+",
         type=str,
         required=True,
-        help='Directory of the destination drive. Example: "E" on Windows',
+        help='Directory of the destination drive. Example: "E" on Windows. Can pass multiple to export to each of them at once',
     )
     parser.add_argument(
         "-c",
@@ -256,22 +465,60 @@ def main():
         default=None,
         help="Not required, but is very nice when plugging your drive into another DJ's laptop. Sets all crates to be within this crate on the destination drive",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=FileCopier.DEFAULT_WORKERS,
+        help=f"Number of files to copy at once. Default: {FileCopier.DEFAULT_WORKERS}",
+    )
+    parser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Update the previous export on the drive instead of replacing it: only copy the files that changed, and delete the ones that are no longer exported",
+    )
+    parser.add_argument(
+        "--hash",
+        dest="hash_files",
+        action="store_true",
+        help="With --incremental, compare file contents when only the modification time changed",
+    )
+    parser.add_argument(
+        "-m",
+        "--merge",
+        action="store_true",
+        help="Update the database on the drive instead of replacing it, keeping what Serato wrote to it (play history, date added, ...)",
+    )
+    parser.add_argument(
+        "-n",
+        "--dry-run",
+        "--dry_run",
+        dest="dry_run",
+        action="store_true",
+        help="Print what would be written, copied and deleted on the drive, without changing anything",
+    )
     args = parser.parse_args()
 
-    dest_dir = cast(str, args.dest_dir)
+    dest_dirs = cast(list[str], args.dest_dirs)
 
     crate_files: list[str] = []
     for cm in cast(list[str], args.crate_matcher):
         crate_files += get_crate_files(cm)
 
-    if platform.system() == "Windows" and len(dest_dir) == 1:
-        dest_dir += ":\\\\"
+    if platform.system() == "Windows":
+        dest_dirs = [dest_dir + ":\\\\" if len(dest_dir) == 1 else dest_dir for dest_dir in dest_dirs]
 
     copy_crates_to_usb(
         crate_files=crate_files,
-        dest_drive_dir=dest_dir,
+        dest_drive_dir=dest_dirs,
         dest_tracks_dir="Tracks",
         root_crate=args.root_crate,
+        max_workers=args.workers,
+        incremental=args.incremental,
+        hash_files=args.hash_files,
+        merge=args.merge,
+        dry_run=args.dry_run,
     )
 
 
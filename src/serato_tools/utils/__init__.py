@@ -11,6 +11,9 @@ SERATO_DIR_NAME = "_Serato_"
 SERATO_DIR = os.path.join(os.path.expanduser("~"), "Music", SERATO_DIR_NAME)
 SERATO_DRIVE = os.path.splitdrive(SERATO_DIR)[0]
 
+PARSE_CACHE_DIR = os.environ.get("SERATO_TOOLS_CACHE_DIR") or None
+""" opt-in, see `SeratoBinFile` """
+
 
 def get_key_from_value(value: T, dict: dict[str, T]) -> str:
     for key, v in dict.items():
@@ -33,11 +36,21 @@ def parse_cli_keys_and_values(args: list[str]):
     return keys_and_values
 
 
+_enum_keys_by_value: dict[Type[Enum], dict[Any, str]] = {}
+""" cache of enum class -> {value: member name}, built on first lookup """
+
+
 def get_enum_key_from_value(value: str | bytes | int, enum_class: Type[Enum]):
-    for member in enum_class:
-        if member.value == value:
-            return member.name
-    raise ValueError(f"no key for value {value}")
+    keys_by_value = _enum_keys_by_value.get(enum_class)
+    if keys_by_value is None:
+        keys_by_value = {}
+        for member in enum_class:
+            keys_by_value.setdefault(member.value, member.name)
+        _enum_keys_by_value[enum_class] = keys_by_value
+    try:
+        return keys_by_value[value]
+    except (KeyError, TypeError):
+        raise ValueError(f"no key for value {value}") from None
 
 
 def to_array(x: T | Iterable[T]) -> Iterable[T]:
@@ -1,13 +1,28 @@
 import os
-import io
 import re
+import mmap
+import bisect
+import codecs
 import struct
 import base64
+import uuid
+import pickle
+import shutil
+import hashlib
 from enum import StrEnum
 import json
-from typing import Iterable, TypedDict, Generator, Optional, cast, Callable, Pattern, NotRequired
+import logging
+from contextlib import contextmanager
+from typing import Any, BinaryIO, TextIO, Iterable, TypedDict, Generator, Optional, cast, Callable, Pattern, NotRequired, Literal
 
-from serato_tools.utils import get_enum_key_from_value, logger, SERATO_DRIVE, DataTypeError, DeeplyNestedListError
+from serato_tools.utils.file_scan import BasenameIndex, DirListingCache
+from serato_tools.utils import (
+    logger,
+    SERATO_DRIVE,
+    PARSE_CACHE_DIR,
+    DataTypeError,
+    DeeplyNestedListError,
+)
 
 
 class SeratoBinFile:
@@ -59,6 +74,16 @@ class SeratoBinFile:
 
     FIELDS = list(f.value for f in Fields)
 
+    FIELD_NAMES: dict[str, str] = {
+        f.value: f.name.replace("_", " ")
+        .title()
+        .replace("Smartcrate", "SmartCrate")
+        .replace("Added U", "Added")
+        .replace("Added T", "Added")
+        for f in Fields
+    }
+    """ field -> display name """
+
     type ParsedField = Fields | str
     type BasicValue = str | bytes | int | bool
 
@@ -75,30 +100,161 @@ class SeratoBinFile:
     DEFAULT_ENTRIES: EntryList
     TRACK_PATH_KEY: Fields
 
-    def __init__(self, file: str):
-        self.filepath = os.path.abspath(file)
+    type IndexItem = tuple[ParsedField, int, int]
+    """ (field, start offset of the entry's header, end offset of the entry's data) """
+
+    type TrackOp = tuple[Literal["filter", "modify"], Callable]
 
-        self.raw_data: bytes
-        self.entries: SeratoBinFile.EntryList
+    def __init__(self, file: str, lazy: bool = False, cache_dir: Optional[str] = PARSE_CACHE_DIR):
+        """
+        lazy: memory-map the file and only index the offsets of its top-level entries, instead of reading and decoding
+        everything up front. Entries are decoded when first accessed, and the fields of a track only when they are
+        read (i.e. `get_track_paths()` only decodes the track path).
+        cache_dir: keep the parsed entries in this directory, and load them from there instead of parsing the next time
+        the file is loaded unchanged. Not used with `lazy`. Default: the `SERATO_TOOLS_CACHE_DIR` environment variable.
+        """
+        self.filepath = os.path.abspath(file)
+        self.lazy = lazy
+
+        self.raw_data: bytes | mmap.mmap
+        self._mapped_file: str | None = None
+        self.modified: bool = False
+        """ `raw_data` has changed since the file was loaded or last saved """
+        self._entries: SeratoBinFile.EntryList | None = None
+        self._buf: memoryview | None = None
+        self._index: list[SeratoBinFile.IndexItem] | None = None
+        self._track_index: dict[str, list[int]] | None = None
+        self._track_index_size: int = 0
+        self._spans: dict[int, tuple[SeratoBinFile.Entry, int, int]] = {}
+        """ id(entry) -> (entry, start, end) of the unchanged top-level entries in `raw_data` """
+        self._batch_depth: int = 0
+        self._dump_pending: bool = False
+        self._pending_track_ops: list[SeratoBinFile.TrackOp] = []
+        self._pending_removals: set[int] = set()
 
         if not self.TRACK_PATH_KEY:
             raise ValueError("need to set TRACK_PATH_KEY in subclass")
 
         if os.path.exists(file):
-            if file.lower().endswith(".json"):
-                with open(file, "r", encoding="utf-8") as f:
-                    self.from_json_object(json.load(f))
+            if file.lower().endswith((".json", ".jsonl")):
+                self.entries = list(SeratoBinFile.iter_json_entries(file))
+                self._dump()
             else:
                 with open(file, "rb") as f:
-                    self.raw_data = f.read()
-                    self.entries = list(SeratoBinFile._parse_item(self.raw_data))
+                    if lazy and os.fstat(f.fileno()).st_size > 0:
+                        self.raw_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                        self._buf = memoryview(self.raw_data)
+                        self._mapped_file = self.filepath
+                        self._index = SeratoBinFile._index_buffer(self._buf, 0, len(self._buf))
+                    else:
+                        self.raw_data = f.read()
+                        self._load_entries(os.fstat(f.fileno()), cache_dir)
         else:
             logger.warning(f"File does not exist: {file}. Using default data to create an empty item.")
             if not self.DEFAULT_ENTRIES:
                 raise ValueError("no self.DEFAULT_ENTRIES passed in subclass")
-            self.entries = self.DEFAULT_ENTRIES
+            self.entries = list(self.DEFAULT_ENTRIES)
             self._dump()
 
+    @property
+    def entries(self) -> "SeratoBinFile.EntryList":
+        self._apply_pending_track_ops()
+        return self._get_entries()
+
+    def _get_entries(self) -> "SeratoBinFile.EntryList":
+        """Same as `entries`, but without applying the track edits that are still queued by `batch()`."""
+        if self._entries is None:
+            if self._buf is None:
+                raise ValueError("no entries loaded")
+            assert self._index is not None
+            self._entries = SeratoBinFile._parse_buffer(self._buf, 0, len(self._buf))
+            self._set_spans(self._entries, self._index)
+            self._index = None
+        return self._entries
+
+    @entries.setter
+    def entries(self, entries: "SeratoBinFile.EntryList"):
+        self._entries = entries
+        self._index = None
+        self._track_index = None
+
+    PARSE_CACHE_VERSION = 1
+
+    def _load_entries(self, stat: os.stat_result, cache_dir: Optional[str]):
+        """Parses `raw_data`, or loads the entries from the parse cache in `cache_dir` if `raw_data` is unchanged."""
+        assert isinstance(self.raw_data, bytes)
+        cache_file = None
+        cache_key = None
+        if cache_dir:
+            cache_file = os.path.join(cache_dir, hashlib.sha1(self.filepath.encode()).hexdigest() + ".pickle")
+            cache_key = (stat.st_size, stat.st_mtime_ns, hashlib.blake2b(self.raw_data, digest_size=16).hexdigest())
+            cached = SeratoBinFile._read_parse_cache(cache_file, cache_key)
+            if cached is not None:
+                self.entries, index = cached
+                self._set_spans(self.entries, index)
+                return
+
+        self.entries = list(SeratoBinFile._parse_item(self.raw_data))
+        index = SeratoBinFile._index_buffer(memoryview(self.raw_data), 0, len(self.raw_data))
+        self._set_spans(self.entries, index)
+
+        if cache_file is not None:
+            SeratoBinFile._write_parse_cache(cache_file, cache_key, self.entries, index)
+
+    @staticmethod
+    def _read_parse_cache(
+        cache_file: str, cache_key: tuple
+    ) -> "tuple[SeratoBinFile.EntryList, list[SeratoBinFile.IndexItem]] | None":
+        try:
+            with open(cache_file, "rb") as f:
+                cached = pickle.load(f)
+            if cached["version"] == SeratoBinFile.PARSE_CACHE_VERSION and cached["key"] == cache_key:
+                return cached["entries"], cached["index"]
+        except FileNotFoundError:
+            pass
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError, AttributeError, ValueError) as e:
+            logger.warning(f"ignoring invalid parse cache {cache_file}: {e}")
+        return None
+
+    @staticmethod
+    def _write_parse_cache(
+        cache_file: str,
+        cache_key: tuple | None,
+        entries: "SeratoBinFile.EntryList",
+        index: "list[SeratoBinFile.IndexItem]",
+    ):
+        cached = {"version": SeratoBinFile.PARSE_CACHE_VERSION, "key": cache_key, "entries": entries, "index": index}
+        temp_file = f"{cache_file}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(temp_file, "wb") as f:
+                pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"could not write parse cache {cache_file}: {e}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def _set_spans(self, entries: "SeratoBinFile.EntryList", index: "list[SeratoBinFile.IndexItem]"):
+        for entry, (_, start, end) in zip(entries, index):
+            self._spans[id(entry)] = (entry, start, end)
+
+    def _is_lazy(self) -> bool:
+        """True if loaded with `lazy=True` and the entries have not been decoded yet."""
+        return self._entries is None and self._index is not None
+
+    def _release_mmap(self):
+        if self._buf is None:
+            return
+        if self._entries is None:
+            self._entries = self.entries
+        self._buf = None
+        self._mapped_file = None
+        try:
+            cast(mmap.mmap, self.raw_data).close()
+        except BufferError:
+            pass  # still referenced by a LazyTrack, is unmapped once that is garbage collected
+
     def __str__(self) -> str:
         return self._stringify_entries(self.get_entries())
 
@@ -121,83 +277,192 @@ class SeratoBinFile:
         type: str
         value: str | int | bool | list["SeratoBinFile.EntryJson"]
 
-    def to_json_object(self) -> list[EntryJson]:
-        def entries_to_json(entries: SeratoBinFile.EntryList) -> list[SeratoBinFile.EntryJson]:
-            result = []
-
-            for field, value in entries:
-                if isinstance(value, list):
-                    value = entries_to_json(value)
-                elif isinstance(value, (bytes, bytearray, memoryview)):
-                    value = base64.b64encode(value).decode("utf-8")  # need to make JSON compatible
-
-                entry_obj: SeratoBinFile.EntryJson = {
-                    "field": field,
-                    "fieldname": SeratoBinFile.get_field_name(field),
-                    "value": value,
-                    "type": type(value).__name__,
-                }
+    @staticmethod
+    def _entry_to_json(field: "SeratoBinFile.ParsedField", value: "SeratoBinFile.Value") -> "SeratoBinFile.EntryJson":
+        value_type = type(value).__name__
+        json_value: str | int | bool | list[SeratoBinFile.EntryJson]
+        if isinstance(value, list):
+            json_value = [SeratoBinFile._entry_to_json(f, v) for f, v in value]
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            json_value = base64.b64encode(value).decode("utf-8")  # need to make JSON compatible
+        elif isinstance(value, (str, int)):
+            json_value = value
+        else:
+            raise DataTypeError(value, [str, int, bool, bytes, list], field)
 
-                result.append(entry_obj)
+        return {
+            "field": field,
+            "fieldname": SeratoBinFile.get_field_name(field),
+            "value": json_value,
+            "type": value_type,
+        }
 
-            return result
+    @staticmethod
+    def _entry_from_json(entry_obj: "SeratoBinFile.EntryJson") -> "SeratoBinFile.Entry":
+        """Checks that the entry is well-formed, i.e. that `value` is of `type`, before converting it back."""
+        if not isinstance(entry_obj, dict):
+            raise ValueError(f"entry must be an object, got: {entry_obj!r}")
+        field = entry_obj["field"]
+        value = entry_obj["value"]
+        value_type = entry_obj["type"]
+        if not isinstance(field, str) or len(field) != 4 or not field.isascii():
+            raise ValueError(f"invalid field: {field!r}")
+
+        if value_type == "list":
+            if not isinstance(value, list):
+                raise DataTypeError(value, list, field)
+            return (field, [SeratoBinFile._entry_from_json(entry) for entry in value])
+        if value_type in ("bytes", "bytearray", "memoryview"):
+            if not isinstance(value, str):
+                raise DataTypeError(value, str, field)
+            return (field, base64.b64decode(value, validate=True))
+        if value_type == "int":
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise DataTypeError(value, int, field)
+            return (field, value)
+        if value_type == "bool":
+            if not isinstance(value, bool):
+                raise DataTypeError(value, bool, field)
+            return (field, value)
+        if value_type == "str":
+            if not isinstance(value, str):
+                raise DataTypeError(value, str, field)
+            return (field, value)
+        raise ValueError(f"unexpected type: {value_type}")
 
-        return entries_to_json(self.entries)
+    def to_json_object(self) -> list[EntryJson]:
+        return [SeratoBinFile._entry_to_json(field, value) for field, value in self.entries]
 
     def from_json_object(self, json_data: list[EntryJson]):
-        def json_to_entries(json_list: list[SeratoBinFile.EntryJson]) -> SeratoBinFile.EntryList:
-            result: SeratoBinFile.EntryList = []
-
-            for entry_obj in json_list:
-                field = entry_obj["field"]
-                value = entry_obj["value"]
-                value_type = entry_obj["type"]
-
-                if value_type == "list":
-                    value = json_to_entries(cast(list[SeratoBinFile.EntryJson], value))
-                elif value_type in ("bytes", "bytearray", "memoryview"):
-                    value = base64.b64decode(cast(bytes, value))
-                elif value_type == "int":
-                    value = int(cast(int, value))
-                elif value_type == "bool":
-                    value = bool(cast(bool, value))
-                elif value_type == "str":
-                    value = str(cast(str, value))
-                else:
-                    raise ValueError(f"unexpected type: {value_type}")
-
-                result.append((field, value))
-
-            return result
-
-        self.entries = json_to_entries(json_data)
+        self.entries = [SeratoBinFile._entry_from_json(entry_obj) for entry_obj in json_data]
         self._dump()
 
-    def write_json(self, filepath: str) -> None:
-        def write_json_array(json_entries: list[SeratoBinFile.EntryJson], indent: int = 0) -> str:
-            indent_str = "  " * indent
-            lines = ["[\n"]
+    def _iter_entries(self) -> Generator["SeratoBinFile.Entry", None, None]:
+        """
+        Same as iterating over `entries`. If loaded with `lazy=True` and not decoded yet, each entry is decoded on its
+        own and not kept, so the entries are never all in memory.
+        """
+        if self._is_lazy() and not self._pending_track_ops:
+            assert self._buf is not None and self._index is not None
+            for _, start, end in self._index:
+                yield SeratoBinFile._parse_buffer(self._buf, start, end)[0]
+            return
+        yield from self.entries
 
-            for i, entry in enumerate(json_entries):
-                if isinstance(entry["value"], list):
-                    lines.append(
-                        f'{indent_str}  {{"field": "{entry["field"]}", "fieldname": "{entry["fieldname"]}", "type": "{entry["type"]}", "value": '
-                    )
-                    lines.append(write_json_array(entry["value"], indent + 1))
-                    lines.append("}")
-                else:
-                    lines.append(f"{indent_str}  {json.dumps(entry, ensure_ascii=False)}")
+    @staticmethod
+    def _dump_json_record(entry_json: "SeratoBinFile.EntryJson", indent: int = 0) -> str:
+        """One entry of a JSON array, with its nested entries one per line."""
+        indent_str = "  " * indent
+        value = entry_json["value"]
+        if not isinstance(value, list):
+            return f"{indent_str}  {json.dumps(entry_json, ensure_ascii=False)}"
+        header = ", ".join(
+            f"{json.dumps(key)}: {json.dumps(entry_json[key], ensure_ascii=False)}"
+            for key in ("field", "fieldname", "type")
+        )
+        nested = ",\n".join(SeratoBinFile._dump_json_record(entry, indent + 1) for entry in value)
+        return f'{indent_str}  {{{header}, "value": [\n{nested}{"\n" if value else ""}{indent_str}  ]}}'
 
-                lines.append(",\n" if i < len(json_entries) - 1 else "\n")
+    @staticmethod
+    def _is_json_lines(filepath: str) -> bool:
+        return filepath.lower().endswith(".jsonl")
+
+    def write_json(self, filepath: str, lines: Optional[bool] = None) -> None:
+        """
+        Writes the entries to `filepath` one at a time, so the JSON is never all in memory (with `lazy=True`, neither
+        are the entries).
+
+        lines: write JSON Lines, one top-level entry (i.e. one track) per line, instead of a JSON array. Default: if
+        `filepath` ends with `.jsonl`.
+        """
+        if lines is None:
+            lines = SeratoBinFile._is_json_lines(filepath)
+        with open(filepath, "w", encoding="utf-8", buffering=SeratoBinFile.WRITE_BUFFER_SIZE) as f:
+            if lines:
+                for field, value in self._iter_entries():
+                    f.write(json.dumps(SeratoBinFile._entry_to_json(field, value), ensure_ascii=False))
+                    f.write("\n")
+                return
+
+            f.write("[\n")
+            n_entries = 0
+            for field, value in self._iter_entries():
+                if n_entries > 0:
+                    f.write(",\n")
+                f.write(SeratoBinFile._dump_json_record(SeratoBinFile._entry_to_json(field, value)))
+                n_entries += 1
+            f.write("\n]" if n_entries > 0 else "]")
+
+    JSON_READ_SIZE = 1024 * 1024
 
-            lines.append(f"{indent_str}]")
-            return "".join(lines)
+    @staticmethod
+    def iter_json_entries(filepath: str) -> Generator["SeratoBinFile.Entry", None, None]:
+        """
+        Reads the top-level entries of a file written by `write_json` one at a time, either a JSON array or JSON Lines
+        (if `filepath` ends with `.jsonl`). Each entry is checked as it is read, and a `ValueError` names the first
+        entry that is not valid.
+        """
+        with open(filepath, "r", encoding="utf-8") as f:
+            records = (
+                SeratoBinFile._iter_json_lines(f)
+                if SeratoBinFile._is_json_lines(filepath)
+                else SeratoBinFile._iter_json_array(f)
+            )
+            for i, record in enumerate(records):
+                try:
+                    yield SeratoBinFile._entry_from_json(record)
+                except (ValueError, KeyError, TypeError, DataTypeError) as e:
+                    raise ValueError(f"invalid entry {i} in {filepath}: {e}") from e
 
-        json_content = write_json_array(self.to_json_object(), indent=0)
+    @staticmethod
+    def _iter_json_lines(f: TextIO) -> Generator[Any, None, None]:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.loads(json_content)  # check
-            f.write(json_content)
+    @staticmethod
+    def _iter_json_array(f: TextIO) -> Generator[Any, None, None]:
+        """Decodes the items of a top-level JSON array, reading `f` in chunks."""
+        decoder = json.JSONDecoder()
+        buf = ""
+        pos = 0
+        eof = False
+
+        def next_char() -> str:
+            """Skips whitespace, reading more if needed. Empty at the end of the file."""
+            nonlocal buf, pos, eof
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return buf[pos : pos + 1]
+                chunk = f.read(SeratoBinFile.JSON_READ_SIZE)
+                buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+
+        if next_char() != "[":
+            raise ValueError("expected a JSON array")
+        pos += 1
+        if next_char() == "]":
+            return
+        while True:
+            next_char()
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    chunk = f.read(SeratoBinFile.JSON_READ_SIZE)
+                    buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            pos = end
+            yield item
+            char = next_char()
+            pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"expected , or ] after array item, got: {char!r}")
 
     def print(self):
         print(self)
@@ -206,85 +471,344 @@ class SeratoBinFile:
         return str(self.raw_data)
 
     class EntryListCls:
-        def __init__(self, entries: "SeratoBinFile.EntryList"):
-            self.fields: list[str] = []
+        """
+        Wraps the entry list of a struct, i.e. a track, as it was parsed. The list is only copied once a value is set,
+        so one of these per track is a small object, rather than one with an attribute per field. Values can also be
+        read as attributes, i.e. `track.tbpm`.
+        """
 
-            for field, value in entries:
+        __slots__ = ("_entries", "_owned", "modified")
+
+        def __init__(self, entries: "SeratoBinFile.EntryList"):
+            for _, value in entries:
                 if isinstance(value, list):
                     raise DeeplyNestedListError
-                setattr(self, field, value)
-                self.fields.append(field)
+            self._entries: SeratoBinFile.EntryList | None = entries
+            self._owned: bool = False  # `_entries` is a copy that only this object references
+            self.modified: bool = False
+
+        def __getattr__(self, name: str):
+            # only called when the name is not a slot or method, i.e. is a field name
+            if name.startswith("_"):
+                raise AttributeError(name)
+            return self.get_value(name)
 
         def __repr__(self) -> str:
             return str(self.to_entries())
 
+        def _get_entries(self) -> "SeratoBinFile.EntryList":
+            assert self._entries is not None
+            return self._entries
+
+        @property
+        def fields(self) -> list[str]:
+            return [field for field, _ in self._get_entries()]
+
         def get_value(self, field: str) -> "SeratoBinFile.Value":
-            return getattr(self, field)
+            for entry_field, value in self._get_entries():
+                if entry_field == field:
+                    return cast(SeratoBinFile.Value, value)
+            raise AttributeError(field)
 
         def set_value(self, field: str, value: "SeratoBinFile.Value"):
-            if field not in self.fields:
-                self.fields.append(field)
-            setattr(self, field, value)
+            entries = self._get_entries()
+            position = len(entries)
+            for i, (entry_field, prev_value) in enumerate(entries):
+                if entry_field == field:
+                    if type(prev_value) is type(value) and prev_value == value:
+                        return
+                    position = i
+                    break
+
+            if not self._owned:
+                entries = self._entries = list(entries)
+                self._owned = True
+            if position < len(entries):
+                entries[position] = (field, value)
+            else:
+                entries.append((field, value))
+            self.modified = True
 
         def to_entries(self) -> "SeratoBinFile.EntryList":
-            return [(f, self.get_value(f)) for f in self.fields]
+            """Returns the entry list itself, which must not be changed in place."""
+            self._owned = False  # shared with the caller now, is copied again before the next change
+            return self._get_entries()
 
     class Track(EntryListCls):
+        __slots__ = ("path_key", "relpath")
+
         def __init__(self, entries: "SeratoBinFile.EntryList", path_key: str):
             super().__init__(entries)
+            self._init_path(path_key)
 
+        def _init_path(self, path_key: str):
             self.path_key = path_key
             relative_path = self.get_value(path_key)
             if not isinstance(relative_path, str):
                 raise DataTypeError(relative_path, str, path_key)
             self.relpath: str = relative_path
 
+        def set_value(self, field: str, value: "SeratoBinFile.Value"):
+            super().set_value(field, value)
+            if field == self.path_key and isinstance(value, str):
+                self.relpath = value
+
         def set_path(self, path: str):
-            relpath = SeratoBinFile.get_relative_path(path)
-            self.set_value(self.path_key, relpath)
-            self.relpath = relpath
+            self.set_value(self.path_key, SeratoBinFile.get_relative_path(path))
 
         def get_full_path(self):
             return SeratoBinFile.get_full_path(self.relpath)
 
+    class LazyTrack(Track):
+        """
+        Track backed by its struct data in the file buffer. Each value is only decoded when it is first read, and the
+        whole struct only once all of it is needed, i.e. for `fields` or a change.
+        """
+
+        __slots__ = ("_buf", "_start", "_end", "_values")
+
+        def __init__(  # pylint: disable=super-init-not-called
+            self, buf: memoryview, start: int, end: int, path_key: str
+        ):
+            self._buf = buf
+            self._start = start
+            self._end = end
+            self._values: dict[str, SeratoBinFile.Value] = {}
+            self._entries = None
+            self._owned = False
+            self.modified = False
+            self._init_path(path_key)
+
+        def _get_entries(self) -> "SeratoBinFile.EntryList":
+            if self._entries is None:
+                entries = SeratoBinFile._parse_buffer(self._buf, self._start, self._end)  # pylint: disable=protected-access
+                for _, value in entries:
+                    if isinstance(value, list):
+                        raise DeeplyNestedListError
+                self._entries = entries
+                self._owned = True
+            return self._entries
+
+        def get_value(self, field: str) -> "SeratoBinFile.Value":
+            if self._entries is not None:
+                return super().get_value(field)
+            value = self._values.get(field)
+            if value is None:
+                span = SeratoBinFile._find_in_buffer(self._buf, self._start, self._end, field)  # pylint: disable=protected-access
+                if span is None:
+                    raise AttributeError(field)
+                value = SeratoBinFile._parse_buffer(self._buf, *span)[0][1]  # pylint: disable=protected-access
+                if isinstance(value, list):
+                    raise DeeplyNestedListError
+                self._values[field] = value
+            return value
+
     def _get_track(self, entries: "SeratoBinFile.EntryList"):
         return SeratoBinFile.Track(entries, path_key=self.TRACK_PATH_KEY)
 
+    def _get_track_at(self, position: int) -> "SeratoBinFile.Track":
+        if self._is_lazy():
+            assert self._buf is not None and self._index is not None
+            field, start, end = self._index[position]
+            header_size = SeratoBinFile.HEADER.size
+            return SeratoBinFile.LazyTrack(self._buf, start + header_size, end, path_key=self.TRACK_PATH_KEY)
+        field, value = self._get_entries()[position]
+        if not isinstance(value, list):
+            raise DataTypeError(value, list, field)
+        return self._get_track(value)
+
+    def _iter_tracks(self) -> Generator["SeratoBinFile.Track", None, None]:
+        self._apply_pending_track_ops()
+        if self._is_lazy():
+            assert self._buf is not None and self._index is not None
+            for field, start, end in self._index:
+                if field == SeratoBinFile.Fields.TRACK:
+                    yield SeratoBinFile.LazyTrack(
+                        self._buf, start + SeratoBinFile.HEADER.size, end, path_key=self.TRACK_PATH_KEY
+                    )
+            return
+
+        for field, value in self.entries:
+            if field == SeratoBinFile.Fields.TRACK:
+                if not isinstance(value, list):
+                    raise DataTypeError(value, list, field)
+                yield self._get_track(value)
+
+    def _get_track_columns(
+        self, fields: list[str]
+    ) -> "tuple[list[int], dict[str, list[SeratoBinFile.Value | None]]]":
+        """
+        Returns the position of each track in `entries`, and for each of `fields`, the value of each track (None if it
+        does not have the field). When lazy, only `fields` are decoded.
+        """
+        self._apply_pending_track_ops()
+        positions: list[int] = []
+        columns: dict[str, list[SeratoBinFile.Value | None]] = {field: [] for field in fields}
+        if self._is_lazy():
+            assert self._buf is not None and self._index is not None
+            buf = self._buf
+            fields_ascii = {field.encode("ascii"): field for field in fields}
+            for i, (field, start, end) in enumerate(self._index):
+                if field == SeratoBinFile.Fields.TRACK:
+                    spans = SeratoBinFile._find_all_in_buffer(buf, start + SeratoBinFile.HEADER.size, end, fields_ascii)
+                    positions.append(i)
+                    for track_field, column in columns.items():
+                        span = spans.get(track_field)
+                        column.append(SeratoBinFile._parse_buffer(buf, *span)[0][1] if span else None)
+            return positions, columns
+
+        for i, (field, value) in enumerate(self.entries):
+            if field == SeratoBinFile.Fields.TRACK:
+                if not isinstance(value, list):
+                    raise DataTypeError(value, list, field)
+                track_values = dict(value)
+                positions.append(i)
+                for track_field, column in columns.items():
+                    column.append(track_values.get(track_field))
+        return positions, columns
+
+    def _set_track_values(self, field: str, values: "dict[int, SeratoBinFile.Value]"):
+        """Sets `field` of the track at each position in `values` (see `_get_track_columns`) to its value."""
+        for position, value in values.items():
+
+            def set_value(track: SeratoBinFile.Track, value=value) -> SeratoBinFile.Track:
+                track.set_value(field, value)
+                return track
+
+            self._modify_track_at(position, set_value)
+        self._dump()
+
     @staticmethod
     def _get_type(field: str) -> str:
         # vrsn field has no type_id, but contains text ("t")
         return "t" if field == SeratoBinFile.Fields.VERSION else field[0]
 
+    HEADER = struct.Struct(">4sI")
+    """ field (4 ascii chars), length of data (big-endian uint32) """
+    _BOOL = struct.Struct("?")
+    _SIGNED_INT = struct.Struct(">H")
+    _UNSIGNED_INT = struct.Struct(">I")
+
+    _parsed_fields: dict[bytes, tuple[str, str]] = {}
+    """ cache of field_ascii -> (field, type_id), so each distinct field is only decoded once """
+
     @staticmethod
-    def _parse_item(item_data: bytes) -> Generator["SeratoBinFile.Entry", None, None]:
-        fp = io.BytesIO(item_data)
-        for header in iter(lambda: fp.read(8), b""):
-            assert len(header) == 8
+    def _get_parsed_field(field_ascii: bytes) -> tuple[str, str]:
+        field = field_ascii.decode("ascii")
+        parsed = (field, SeratoBinFile._get_type(field))
+        SeratoBinFile._parsed_fields[field_ascii] = parsed
+        return parsed
+
+    @staticmethod
+    def _index_buffer(buf: memoryview, offset: int, end: int) -> "list[SeratoBinFile.IndexItem]":
+        """Walks the headers of the entries in `buf[offset:end]` without decoding any data."""
+        unpack_header = SeratoBinFile.HEADER.unpack_from
+        header_size = SeratoBinFile.HEADER.size
+        parsed_fields = SeratoBinFile._parsed_fields
+
+        index: list[SeratoBinFile.IndexItem] = []
+        while offset < end:
+            if offset + header_size > end:
+                raise ValueError(f"truncated header at offset {offset}")
             field_ascii: bytes
             length: int
-            field_ascii, length = struct.unpack(">4sI", header)
-            field: str = field_ascii.decode("ascii")
-            type_id: str = SeratoBinFile._get_type(field)
+            field_ascii, length = unpack_header(buf, offset)
+            parsed_field = parsed_fields.get(field_ascii)
+            if parsed_field is None:
+                parsed_field = SeratoBinFile._get_parsed_field(field_ascii)
+            entry_end = offset + header_size + length
+            if entry_end > end:
+                raise ValueError(f"truncated data for field: {parsed_field[0]}")
+            index.append((parsed_field[0], offset, entry_end))
+            offset = entry_end
+        return index
 
-            data = fp.read(length)
-            assert len(data) == length
+    @staticmethod
+    def _find_in_buffer(buf: memoryview, offset: int, end: int, field: str) -> tuple[int, int] | None:
+        """Walks the headers in `buf[offset:end]` until `field` is found. Returns (header start, data end), if found."""
+        field_ascii = field.encode("ascii")
+        unpack_header = SeratoBinFile.HEADER.unpack_from
+        header_size = SeratoBinFile.HEADER.size
+        while offset + header_size <= end:
+            entry_field: bytes
+            length: int
+            entry_field, length = unpack_header(buf, offset)
+            entry_end = offset + header_size + length
+            if entry_field == field_ascii:
+                return (offset, min(entry_end, end))
+            offset = entry_end
+        return None
+
+    @staticmethod
+    def _find_all_in_buffer(
+        buf: memoryview, offset: int, end: int, fields: dict[bytes, str]
+    ) -> dict[str, tuple[int, int]]:
+        """Same as `_find_in_buffer`, for each of `fields` (ascii -> field), in a single walk."""
+        unpack_header = SeratoBinFile.HEADER.unpack_from
+        header_size = SeratoBinFile.HEADER.size
+        spans: dict[str, tuple[int, int]] = {}
+        while offset + header_size <= end and len(spans) < len(fields):
+            entry_field: bytes
+            length: int
+            entry_field, length = unpack_header(buf, offset)
+            entry_end = offset + header_size + length
+            field = fields.get(entry_field)
+            if field is not None:
+                spans[field] = (offset, min(entry_end, end))
+            offset = entry_end
+        return spans
+
+    @staticmethod
+    def _parse_item(item_data: bytes | memoryview) -> Generator["SeratoBinFile.Entry", None, None]:
+        buf = memoryview(item_data)
+        yield from SeratoBinFile._parse_buffer(buf, 0, len(buf))
+
+    @staticmethod
+    def _parse_buffer(buf: memoryview, offset: int, end: int) -> "SeratoBinFile.EntryList":
+        """
+        Parses the entries in `buf[offset:end]`, walking the buffer by offset. Nested structs are parsed in place from
+        the same buffer, so no intermediate copies of the data are made.
+        """
+        unpack_header = SeratoBinFile.HEADER.unpack_from
+        header_size = SeratoBinFile.HEADER.size
+        parsed_fields = SeratoBinFile._parsed_fields
+        decode_text = codecs.utf_16_be_decode
+
+        entries: SeratoBinFile.EntryList = []
+        while offset < end:
+            if offset + header_size > end:
+                raise ValueError(f"truncated header at offset {offset}")
+            field_ascii: bytes
+            length: int
+            field_ascii, length = unpack_header(buf, offset)
+            parsed_field = parsed_fields.get(field_ascii)
+            if parsed_field is None:
+                parsed_field = SeratoBinFile._get_parsed_field(field_ascii)
+            field, type_id = parsed_field
+
+            start = offset + header_size
+            offset = start + length
+            if offset > end:
+                raise ValueError(f"truncated data for field: {field}")
 
             value: SeratoBinFile.Value
             if type_id in ("o", "r"):  #  struct
-                value = list(SeratoBinFile._parse_item(data))
+                value = SeratoBinFile._parse_buffer(buf, start, offset)
             elif type_id in ("p", "t"):  # text
                 # value = (data[1:] + b"\00").decode("utf-16") # from imported code
-                value = data.decode("utf-16-be")
+                value = decode_text(buf[start:offset], "strict", True)[0]
             elif type_id == "b":  # single byte, is a boolean
-                value = cast(bool, struct.unpack("?", data)[0])
+                value = SeratoBinFile._BOOL.unpack_from(buf, start)[0]
             elif type_id == "s":  # signed int
-                value = cast(int, struct.unpack(">H", data)[0])
+                value = SeratoBinFile._SIGNED_INT.unpack_from(buf, start)[0]
             elif type_id == "u":  # unsigned int
-                value = cast(int, struct.unpack(">I", data)[0])
+                value = SeratoBinFile._UNSIGNED_INT.unpack_from(buf, start)[0]
             else:
                 raise ValueError(f"unexpected type for field: {field}")
 
-            yield field, value
+            entries.append((field, value))
+
+        return entries
 
     @staticmethod
     def _dump_item(entry: Entry) -> bytes:
@@ -326,76 +850,493 @@ class SeratoBinFile:
         return b"".join(SeratoBinFile._dump_item(entry) for entry in entries)
 
     def _dump(self):
-        self.raw_data = SeratoBinFile._dump_entries(self.entries)
+        """
+        Re-encodes the entries to `raw_data`. Top-level entries that are unchanged since they were parsed or last dumped
+        are copied straight from the current `raw_data`, so only modified entries are encoded.
+
+        An entry counts as modified when it is replaced in `entries`, so its value must never be mutated in place.
+
+        Inside `batch()`, this is deferred until the block exits.
+        """
+        if self._batch_depth > 0:
+            self._dump_pending = True
+            return
+        self._dump_now()
+
+    def _dump_now(self):
+        self._dump_pending = False
+        data, spans = self._dump_with_spans()
+        self.modified = self.modified or self._spans_changed(spans, len(data))
+        self._spans = spans
+        self._release_mmap()
+        self.raw_data = data
+
+    def _dump_with_spans(self) -> "tuple[bytes, dict[int, tuple[SeratoBinFile.Entry, int, int]]]":
+        entries = self.entries  # decode first, so lazily loaded entries have their spans in `raw_data`
+        old_buf = memoryview(self.raw_data if self._spans else b"")
+        spans: dict[int, tuple[SeratoBinFile.Entry, int, int]] = {}
+        chunks = list(self._iter_dump_chunks(entries, old_buf, spans))
+        data = b"".join(chunks)
+        for chunk in chunks:
+            if isinstance(chunk, memoryview):
+                chunk.release()
+        old_buf.release()
+        return data, spans
+
+    def _iter_dump_chunks(
+        self,
+        entries: "SeratoBinFile.EntryList",
+        old_buf: memoryview,
+        spans: "dict[int, tuple[SeratoBinFile.Entry, int, int]]",
+    ) -> Generator[bytes | memoryview, None, None]:
+        """Yields the encoded entries, with unchanged ones as slices of `old_buf`. Fills `spans` for the output."""
+        offset = 0
+        # consecutive unchanged entries are copied as a single slice
+        copy_start = copy_end = 0
+        for entry in entries:
+            span = self._spans.get(id(entry))
+            if span is not None and span[0] is entry:
+                _, start, end = span
+                if start != copy_end:
+                    if copy_end > copy_start:
+                        yield old_buf[copy_start:copy_end]
+                    copy_start = start
+                copy_end = end
+                length = end - start
+            else:
+                if copy_end > copy_start:
+                    yield old_buf[copy_start:copy_end]
+                copy_start = copy_end = 0
+                chunk = SeratoBinFile._dump_item(entry)
+                yield chunk
+                length = len(chunk)
+            spans[id(entry)] = (entry, offset, offset + length)
+            offset += length
+        if copy_end > copy_start:
+            yield old_buf[copy_start:copy_end]
+
+    def _spans_changed(self, spans: "dict[int, tuple[SeratoBinFile.Entry, int, int]]", size: int) -> bool:
+        """True if the `size` bytes laid out as `spans` are not the same as the current `raw_data`."""
+        if not self._spans or len(spans) != len(self._spans) or size != len(self.raw_data):
+            return True
+        return any(self._spans.get(key) != span for key, span in spans.items())
+
+    def _is_dirty(self) -> bool:
+        """True if `raw_data` is behind the entries, i.e. inside `batch()`."""
+        return self._dump_pending or bool(self._pending_track_ops) or bool(self._pending_removals)
+
+    def _sync_raw_data(self):
+        if self._is_dirty():
+            self._dump_now()
+
+    @contextmanager
+    def batch(self, save: bool = False, file: Optional[str] = None):
+        """
+        Batches edits: `raw_data` is only re-encoded once, when the block exits, instead of after every edit. Calls to
+        `filter_tracks` and `modify_tracks` (and the methods built on them) are queued, and applied together in a single
+        pass over the tracks once the entries are next read. Removed tracks are dropped in one go as well.
+
+        `entries` is kept up to date inside the block, `raw_data` is not.
+
+        save: save to `file` (default: the loaded file) when the block exits without an error.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+        if save:
+            self.save(file)
+        elif self._batch_depth == 0:
+            self._sync_raw_data()
 
     def get_track_paths(self, include_drive: bool = False) -> list[str]:
-        track_paths: list[str] = []
-        for field, value in self.entries:
-            if field == SeratoBinFile.Fields.TRACK:
-                if not isinstance(value, list):
-                    raise DataTypeError(value, list, field)
-                track = self._get_track(value)
-                track_path = track.get_full_path() if include_drive else track.relpath
-                track_paths.append(track_path)
-        return track_paths
+        return [track.get_full_path() if include_drive else track.relpath for track in self._iter_tracks()]
 
-    def modify_tracks(self, func: Callable[[Track], Track]):
-        for i, (field, value) in enumerate(self.entries):
-            if field == SeratoBinFile.Fields.TRACK:
-                if not isinstance(value, list):
-                    raise DataTypeError(value, list, field)
-                track = self._get_track(value)
-                new_track = func(track)
-                self.entries[i] = (field, new_track.to_entries())
-        self._dump()
+    @staticmethod
+    def _get_track_key(relpath: str) -> str:
+        return relpath.upper()
+
+    def _get_track_index(self) -> dict[str, list[int]]:
+        """
+        Positions of the track entries in `self.entries`, keyed by the upper-cased relative track path. Built on first
+        use, and then kept up to date by the methods that add, remove, or change the path of tracks.
+        """
+        size = len(self._entries) if self._entries is not None else len(self._index or [])
+        if self._track_index is not None and self._track_index_size == size:
+            return self._track_index
+
+        self._apply_pending_track_ops()
+        size = len(self._get_entries()) if not self._is_lazy() else len(self._index or [])
+
+        track_index: dict[str, list[int]] = {}
+        path_key = self.TRACK_PATH_KEY
+        if self._is_lazy():
+            assert self._buf is not None and self._index is not None
+            header_size = SeratoBinFile.HEADER.size
+            for i, (field, start, end) in enumerate(self._index):
+                if field == SeratoBinFile.Fields.TRACK:
+                    span = SeratoBinFile._find_in_buffer(self._buf, start + header_size, end, path_key)
+                    relpath = SeratoBinFile._parse_buffer(self._buf, *span)[0][1] if span else None
+                    if not isinstance(relpath, str):
+                        raise DataTypeError(relpath, str, path_key)
+                    track_index.setdefault(SeratoBinFile._get_track_key(relpath), []).append(i)
+        else:
+            for i, (field, value) in enumerate(self.entries):
+                if field == SeratoBinFile.Fields.TRACK:
+                    if not isinstance(value, list):
+                        raise DataTypeError(value, list, field)
+                    relpath = next((v for f, v in value if f == path_key), None)
+                    if not isinstance(relpath, str):
+                        raise DataTypeError(relpath, str, path_key)
+                    track_index.setdefault(SeratoBinFile._get_track_key(relpath), []).append(i)
+
+        self._track_index = track_index
+        self._track_index_size = size
+        return track_index
+
+    def _find_track_positions(self, filepath: str, case_sensitive: bool = True) -> list[int]:
+        if self._pending_track_ops:
+            self._apply_pending_track_ops()
+        relpath = SeratoBinFile.get_relative_path(filepath)
+        positions = self._get_track_index().get(SeratoBinFile._get_track_key(relpath), [])
+        if self._pending_removals:
+            positions = [i for i in positions if i not in self._pending_removals]
+        if case_sensitive:
+            positions = [i for i in positions if self._get_track_at(i).relpath == relpath]
+        return positions
+
+    def _update_track_index(self, position: int, old_relpath: str | None, new_relpath: str | None):
+        if self._track_index is None:
+            return
+        if old_relpath is not None:
+            old_key = SeratoBinFile._get_track_key(old_relpath)
+            positions = self._track_index.get(old_key, [])
+            if position in positions:
+                positions.remove(position)
+            if not positions:
+                self._track_index.pop(old_key, None)
+        if new_relpath is not None:
+            self._track_index.setdefault(SeratoBinFile._get_track_key(new_relpath), []).append(position)
+
+    def has_track(self, filepath: str, case_sensitive: bool = True) -> bool:
+        return len(self._find_track_positions(filepath, case_sensitive)) > 0
+
+    def _append_track(self, entries: "SeratoBinFile.EntryList"):
+        if self._pending_track_ops:
+            self._apply_pending_track_ops()
+        track = self._get_track(entries)
+        all_entries = self._get_entries()
+        index_is_current = self._track_index is not None and self._track_index_size == len(all_entries)
+        all_entries.append((SeratoBinFile.Fields.TRACK, entries))
+        self._dump_pending = True  # encoded on save, rather than after every appended track
+        if index_is_current:
+            self._track_index_size += 1
+            self._update_track_index(len(all_entries) - 1, None, track.relpath)
+
+    def _modify_track_at(self, position: int, func: Callable[[Track], Track]):
+        entries = self._get_entries()
+        field, value = entries[position]
+        if not isinstance(value, list):
+            raise DataTypeError(value, list, field)
+        track = self._get_track(value)
+        old_relpath = track.relpath
+        new_track = func(track)
+        if new_track is track and not track.modified:
+            return
+        entries[position] = (field, new_track.to_entries())
+        new_relpath = cast(str, new_track.get_value(self.TRACK_PATH_KEY))
+        if new_relpath != old_relpath:
+            self._update_track_index(position, old_relpath, new_relpath)
+
+    def _apply_pending_track_ops(self):
+        if not self._pending_track_ops and not self._pending_removals:
+            return
+        ops, self._pending_track_ops = self._pending_track_ops, []
+        removed, self._pending_removals = self._pending_removals, set()
+        if ops:
+            self._apply_track_ops(ops, removed)
+        else:
+            self._remove_positions(removed)
+
+    def _apply_track_ops(self, ops: "list[SeratoBinFile.TrackOp]", removed: set[int]):
+        """
+        Applies the filter and modify functions to each track in order, in a single pass over the entries. Rebuilds the
+        track index along the way.
+        """
+        lazy = self._is_lazy()
+        path_key = self.TRACK_PATH_KEY
+        new_entries: SeratoBinFile.EntryList = []
+        track_index: dict[str, list[int]] = {}
+
+        count = len(self._index or []) if lazy else len(self._get_entries())
+        for i in range(count):
+            if i in removed:
+                continue
+            entry: SeratoBinFile.Entry | None = None
+            start, end = 0, 0
+            if lazy:
+                assert self._buf is not None and self._index is not None
+                field, start, end = self._index[i]
+            else:
+                entry = self._get_entries()[i]
+                field = entry[0]
 
-    def filter_tracks(self, func: Callable[[Track], bool]):
-        new_entries: "SeratoBinFile.EntryList" = []
-        for field, value in self.entries:
             if field == SeratoBinFile.Fields.TRACK:
-                if not isinstance(value, list):
-                    raise DataTypeError(value, list, field)
-                track = self._get_track(value)
-                if not func(track):
+                track: SeratoBinFile.Track | None = self._get_track_at(i)
+                original_track = track
+                for kind, func in ops:
+                    assert track is not None
+                    if kind == "filter":
+                        if not func(track):
+                            track = None
+                            break
+                    else:
+                        track = func(track)
+                if track is None:
                     continue
-            new_entries.append((field, value))
+                if track is not original_track or track.modified:
+                    entry = (field, track.to_entries())
+                relpath = cast(str, track.get_value(path_key))
+                track_index.setdefault(SeratoBinFile._get_track_key(relpath), []).append(len(new_entries))
+
+            if entry is None:  # lazy, and unchanged
+                assert self._buf is not None
+                entry = SeratoBinFile._parse_buffer(self._buf, start, end)[0]
+                self._spans[id(entry)] = (entry, start, end)
+            new_entries.append(entry)
+
         self.entries = new_entries
+        self._track_index = track_index
+        self._track_index_size = len(new_entries)
+
+    def _remove_positions(self, removed: set[int]):
+        entries = self._get_entries()
+        track_index = self._track_index if self._track_index_size == len(entries) else None
+        self.entries = [entry for i, entry in enumerate(entries) if i not in removed]
+        if track_index is not None:
+            removed_sorted = sorted(removed)
+            for key in list(track_index):
+                positions = [p - bisect.bisect_left(removed_sorted, p) for p in track_index[key] if p not in removed]
+                if positions:
+                    track_index[key] = positions
+                else:
+                    del track_index[key]
+            self._track_index = track_index
+            self._track_index_size = len(self._get_entries())
+
+    def _queue_track_op(self, op: "SeratoBinFile.TrackOp"):
+        self._pending_track_ops.append(op)
+        if self._batch_depth == 0:
+            self._apply_pending_track_ops()
         self._dump()
 
+    def modify_tracks(self, func: Callable[[Track], Track]):
+        self._queue_track_op(("modify", func))
+
+    def filter_tracks(self, func: Callable[[Track], bool]):
+        self._queue_track_op(("filter", func))
+
     def remove_track(self, filepath: str):
-        self.filter_tracks(lambda track: track.relpath != SeratoBinFile.get_relative_path(filepath))
+        positions = self._find_track_positions(filepath)
+        if not positions:
+            return
+        self._pending_removals.update(positions)
+        if self._batch_depth == 0:
+            self._apply_pending_track_ops()
+        self._dump()
 
     def remove_duplicates(self):
-        track_paths: list[str] = []
+        track_paths: set[str] = set()
 
         def filter_track(track: "SeratoBinFile.Track") -> bool:
             was_in_track_paths = track.relpath not in track_paths
-            track_paths.append(track.relpath)
+            track_paths.add(track.relpath)
             return was_in_track_paths
 
         self.filter_tracks(filter_track)
 
+    WRITE_BUFFER_SIZE = 1024 * 1024
+
+    def to_bytes(self) -> bytes:
+        """The encoded file, as `save` would write it."""
+        self._sync_raw_data()
+        return bytes(self.raw_data)
+
     def save(self, file: Optional[str] = None):
+        """
+        Writes to a temporary file in the same directory, flushes it to disk, and then renames it over `file`. A crash
+        mid-write therefore never leaves a truncated file behind, and other programs reading `file` see either the old
+        or the new version.
+
+        Edits that are still pending (i.e. inside `batch()`) are encoded straight into the temporary file, rather than
+        into `raw_data` first.
+        """
         if file is None:
             file = self.filepath
-        if file.lower().endswith(".json"):
-            raise ValueError("cannot save raw data to .json")
-        with open(file, "wb") as f:
-            f.write(self.raw_data)
+        if file.lower().endswith((".json", ".jsonl")):
+            raise ValueError("cannot save raw data to .json, use write_json")
+        file = os.path.abspath(file)
+
+        dirty = self._is_dirty()
+        if not dirty and self._buf is not None and file == self._mapped_file:
+            # still memory-mapped, so is unmodified.
+            return
+
+        spans: dict[int, tuple[SeratoBinFile.Entry, int, int]] = {}
+        # on Windows, a file cannot be replaced while it is memory-mapped
+        before_replace = self._release_mmap if file == self._mapped_file else None
+        try:
+            with SeratoBinFile._write_atomic(file, before_replace=before_replace) as f:
+                if dirty:
+                    entries = self.entries
+                    old_buf = memoryview(self.raw_data if self._spans else b"")
+                    size = 0
+                    for chunk in self._iter_dump_chunks(entries, old_buf, spans):
+                        size += f.write(chunk)
+                        if isinstance(chunk, memoryview):
+                            chunk.release()
+                    old_buf.release()
+                    self.modified = self.modified or self._spans_changed(spans, size)
+                else:
+                    f.write(self.raw_data)
+        except BaseException:
+            if self._buf is None and isinstance(self.raw_data, mmap.mmap) and self.raw_data.closed:
+                self._spans = {}  # nothing left to copy unchanged entries from, re-encode everything on the next dump
+            raise
+
+        if dirty:
+            self._release_mmap()
+            self._dump_pending = False
+            self._spans = spans
+            self._load_saved(file)
+        if file == self.filepath:
+            self.modified = False
+
+    def _load_saved(self, file: str):
+        """Points `raw_data` at the just-saved `file`, instead of keeping a second, in-memory copy of it."""
+        with open(file, "rb") as f:
+            if self.lazy and os.fstat(f.fileno()).st_size > 0:
+                self.raw_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._buf = memoryview(self.raw_data)
+                self._mapped_file = file
+            else:
+                self.raw_data = f.read()
 
     @staticmethod
-    def get_field_name(field: str) -> str:
+    @contextmanager
+    def _write_atomic(
+        file: str, before_replace: Optional[Callable[[], None]] = None
+    ) -> Generator[BinaryIO, None, None]:
+        """
+        Yields a temporary file in the same directory as `file`. When the block exits without an error, it is flushed
+        to disk and renamed over `file`, otherwise it is removed.
+
+        before_replace: called right before the rename.
+        """
+        temp_file = f"{file}.{uuid.uuid4().hex[:8]}.tmp"
+        # unlike tempfile.mkstemp, respects the umask for a new file
+        fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
         try:
-            return (
-                get_enum_key_from_value(field, SeratoBinFile.Fields)
-                .replace("_", " ")
-                .title()
-                .replace("Smartcrate", "SmartCrate")
-                .replace("Added U", "Added")
-                .replace("Added T", "Added")
-            )
-        except ValueError:
-            return "Unknown Field"
+            with os.fdopen(fd, "wb", buffering=SeratoBinFile.WRITE_BUFFER_SIZE) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(file):
+                shutil.copymode(file, temp_file)
+            if before_replace is not None:
+                before_replace()
+            os.replace(temp_file, file)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        SeratoBinFile._fsync_dir(os.path.dirname(file))
+
+    @staticmethod
+    def _fsync_dir(dirpath: str):
+        """Makes a rename in `dirpath` durable. Not possible (nor needed) on Windows."""
+        if os.name == "nt":
+            return
+        fd = os.open(dirpath, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _iter_file_items(f: BinaryIO) -> Generator[tuple[str, bytes], None, None]:
+        """Reads the top-level entries of `f` one at a time. Yields (field, encoded entry), header included."""
+        header_size = SeratoBinFile.HEADER.size
+        parsed_fields = SeratoBinFile._parsed_fields
+        while header := f.read(header_size):
+            if len(header) < header_size:
+                raise ValueError("truncated header at end of file")
+            field_ascii: bytes
+            length: int
+            field_ascii, length = SeratoBinFile.HEADER.unpack(header)
+            parsed_field = parsed_fields.get(field_ascii)
+            if parsed_field is None:
+                parsed_field = SeratoBinFile._get_parsed_field(field_ascii)
+            data = f.read(length)
+            if len(data) < length:
+                raise ValueError(f"truncated data for field: {parsed_field[0]}")
+            yield parsed_field[0], header + data
+
+    @classmethod
+    def _get_file_track(cls, item: bytes) -> "SeratoBinFile.LazyTrack":
+        return SeratoBinFile.LazyTrack(memoryview(item), SeratoBinFile.HEADER.size, len(item), path_key=cls.TRACK_PATH_KEY)
+
+    @classmethod
+    def iter_file_tracks(cls, file: str) -> Generator["SeratoBinFile.Track", None, None]:
+        """
+        Yields the tracks of `file`, read straight from the file one at a time, so memory use does not grow with the
+        size of the file. Each track only decodes the fields that are read from it.
+        """
+        with open(file, "rb", buffering=SeratoBinFile.WRITE_BUFFER_SIZE) as f:
+            for field, item in SeratoBinFile._iter_file_items(f):
+                if field == SeratoBinFile.Fields.TRACK:
+                    yield cls._get_file_track(item)
+
+    @classmethod
+    def transform_file(
+        cls,
+        src: str,
+        dest: Optional[str] = None,
+        filter_func: Optional[Callable[[Track], bool]] = None,
+        modify_func: Optional[Callable[[Track], Track]] = None,
+    ) -> int:
+        """
+        Streams the entries of `src` to `dest`, dropping the tracks for which `filter_func` is false and passing the
+        others through `modify_func`, like `filter_tracks` and `modify_tracks`. Only one entry is held in memory at a
+        time. Entries that are not tracks, and tracks that are unchanged, are copied as is.
+
+        dest: default: `src`. Written the same way as `save()`.
+
+        Returns the number of tracks written.
+        """
+        dest = os.path.abspath(dest if dest is not None else src)
+        if dest.lower().endswith((".json", ".jsonl")):
+            raise ValueError("cannot save raw data to .json, use write_json")
+        n_tracks = 0
+        with SeratoBinFile._write_atomic(dest) as out:
+            with open(src, "rb", buffering=SeratoBinFile.WRITE_BUFFER_SIZE) as f:
+                for field, item in SeratoBinFile._iter_file_items(f):
+                    if field == SeratoBinFile.Fields.TRACK:
+                        track = cls._get_file_track(item)
+                        if filter_func is not None and not filter_func(track):
+                            continue
+                        if modify_func is not None:
+                            new_track = modify_func(track)
+                            if new_track is not track or new_track.modified:
+                                item = SeratoBinFile._dump_item((field, new_track.to_entries()))
+                        n_tracks += 1
+                    out.write(item)
+        return n_tracks
+
+    @staticmethod
+    def get_field_name(field: str) -> str:
+        return SeratoBinFile.FIELD_NAMES.get(field, "Unknown Field")
 
     @staticmethod
     def _check_valid_field(field: str):
@@ -412,11 +1353,11 @@ class SeratoBinFile:
 
     @staticmethod
     def get_full_path(filepath: str):
-        drive, filepath = os.path.splitdrive(filepath)[1]
+        drive = os.path.splitdrive(filepath)[0]
         if drive:
             return filepath
         else:
-            return os.path.normpath(os.path.join(SERATO_DRIVE, "\\", filepath))
+            return os.path.normpath(os.path.join(SERATO_DRIVE + os.sep, filepath))
 
     def get_entries(self) -> Generator[EntryFull, None, None]:
         """Get entry fieldnames."""
@@ -456,8 +1397,19 @@ class SeratoBinFile:
         """ (filename: str, prev_value: ValueType | None) -> new_value: ValueType | None """
         files: NotRequired[list[str]]
 
-    def modify(self, rules: list[ModifyRule]):
-        # check rule fields
+    class ModifyChange(TypedDict):
+        track: str
+        """ relative path of the track, before the change """
+        field: str
+        old_value: "SeratoBinFile.ValueOrNone"
+        """ None if the track did not have the field """
+        new_value: "SeratoBinFile.Value"
+
+    type CompiledRule = tuple[Callable[[str, "SeratoBinFile.ValueOrNone"], "SeratoBinFile.ValueOrNone"], set[str] | None]
+    """ (func, uppercased relative paths of the files it applies to, or None for all) """
+
+    @staticmethod
+    def _compile_modify_rules(rules: list[ModifyRule]) -> "dict[str, SeratoBinFile.CompiledRule]":
         all_field_names = [rule["field"] for rule in rules]
         assert len(list(rules)) == len(
             list(set(all_field_names))
@@ -465,19 +1417,34 @@ class SeratoBinFile:
         for field in all_field_names:
             SeratoBinFile._check_valid_field(field)
 
-        # fix some rules if needed
-        for rule in rules:
-            if "files" in rule:
-                rule["files"] = [SeratoBinFile.get_relative_path(file).upper() for file in rule["files"]]
+        return {
+            rule["field"]: (
+                rule["func"],
+                {SeratoBinFile.get_relative_path(file).upper() for file in rule["files"]} if "files" in rule else None,
+            )
+            for rule in rules
+        }
+
+    def modify(self, rules: list[ModifyRule]) -> list[ModifyChange]:
+        """
+        Applies `rules` to the tracks. The rules are looked up by field, so each track is visited once regardless of
+        the number of rules.
 
-        def _maybe_perform_rule(field: str, prev_val: "SeratoBinFile.ValueOrNone", track_relpath: str):
-            rule = next((r for r in rules if field == r["field"]), None)
+        Returns every value that was changed. Each change is only logged at debug level, with a summary at info level.
+        """
+        compiled = SeratoBinFile._compile_modify_rules(rules)
+        changes: list[SeratoBinFile.ModifyChange] = []
+
+        def _maybe_perform_rule(field: str, prev_val: "SeratoBinFile.ValueOrNone", track: SeratoBinFile.Track):
+            rule = compiled.get(field)
             if rule is None:
                 return None
-            if "files" in rule and track_relpath.upper() not in rule["files"]:
+            func, files = rule
+            track_relpath = track.relpath
+            if files is not None and track_relpath.upper() not in files:
                 return None
 
-            maybe_new_value = rule["func"](track_relpath, prev_val)
+            maybe_new_value = func(track_relpath, prev_val)
             if maybe_new_value is None or maybe_new_value == prev_val:
                 return None
 
@@ -488,69 +1455,139 @@ class SeratoBinFile:
                     raise FileNotFoundError(f"set track location to {maybe_new_value}, but doesn't exist")
                 maybe_new_value = SeratoBinFile.get_relative_path(maybe_new_value)
 
-            field_name = SeratoBinFile.get_field_name(field)
-            logger.info(f"Set {field}({field_name})={str(maybe_new_value)} in library for {track_relpath}")
+            changes.append({"track": track_relpath, "field": field, "old_value": prev_val, "new_value": maybe_new_value})
+            if logger.isEnabledFor(logging.DEBUG):
+                field_name = SeratoBinFile.get_field_name(field)
+                logger.debug(f"Set {field}({field_name})={str(maybe_new_value)} in library for {track_relpath}")
             return maybe_new_value
 
         def modify_track(track: SeratoBinFile.Track) -> SeratoBinFile.Track:
+            seen: set[str] = set()
             for f, v in track.to_entries():
-                maybe_new_value = _maybe_perform_rule(f, v, track.relpath)
-                if maybe_new_value is not None:
-                    track.set_value(f, maybe_new_value)
-            for rule in rules:
-                if rule["field"] not in track.fields:
-                    maybe_new_value = _maybe_perform_rule(rule["field"], None, track.relpath)
+                if f in compiled:
+                    seen.add(f)
+                    maybe_new_value = _maybe_perform_rule(f, v, track)
+                    if maybe_new_value is not None:
+                        track.set_value(f, maybe_new_value)
+            for field in compiled:
+                if field not in seen:
+                    maybe_new_value = _maybe_perform_rule(field, None, track)
                     if maybe_new_value is not None:
-                        track.set_value(rule["field"], maybe_new_value)
+                        track.set_value(field, maybe_new_value)
             return track
 
-        self.modify_tracks(modify_track)
+        if compiled and all(files is not None for _, files in compiled.values()):
+            # only the tracks of the given files can change, look them up instead of visiting every track
+            positions: set[int] = set()
+            for _, files in compiled.values():
+                for file in files or ():
+                    positions.update(self._find_track_positions(file, case_sensitive=False))
+            for i in sorted(positions):
+                self._modify_track_at(i, modify_track)
+            self._dump()
+        elif compiled:
+            self.modify_tracks(modify_track)
+
+        if changes:
+            logger.info(f"Set {len(changes)} values in library, in {len({c['track'] for c in changes})} tracks")
+        return changes
 
-    def modify_and_save(self, rules: list[ModifyRule], file: Optional[str] = None):
-        self.modify(rules)
+    def modify_and_save(self, rules: list[ModifyRule], file: Optional[str] = None) -> list[ModifyChange]:
+        changes = self.modify(rules)
         self.save(file)
+        return changes
 
     def change_track_path(self, src: str, dest: str):
-        self.modify([{"field": self.TRACK_PATH_KEY, "files": [src], "func": lambda *args: dest}])
+        positions = self._find_track_positions(src, case_sensitive=False)
+        if not positions:
+            return
+        if not os.path.exists(SeratoBinFile.get_full_path(dest)):
+            raise FileNotFoundError(f"set track location to {dest}, but doesn't exist")
+
+        def set_path(track: SeratoBinFile.Track) -> SeratoBinFile.Track:
+            track.set_path(dest)
+            field_name = SeratoBinFile.get_field_name(self.TRACK_PATH_KEY)
+            logger.info(f"Set {self.TRACK_PATH_KEY}({field_name})={track.relpath} in library for {src}")
+            return track
 
-    def find_missing(self):
-        new_entries: SeratoBinFile.EntryList = []
-        new_dir: str | None = None
-        for field, value in self.entries:
-            if field == SeratoBinFile.Fields.TRACK:
-                if not isinstance(value, list):
-                    raise DataTypeError(value, list, field)
-                track = self._get_track(value)
-                track_path = track.get_full_path()
-                if not os.path.isfile(track_path):
-                    print(f"missing: {track_path}")
-                    new_location = None
-                    if new_dir is not None:
-                        possible_new_loc = os.path.join(new_dir, os.path.basename(track_path))
-                        if os.path.isfile(possible_new_loc):
-                            new_location = possible_new_loc
-                    if not new_location:
-                        while True:
-                            new_location = os.path.normpath(
-                                input(
-                                    'enter new location of file, or directory to look for missing files, or "s" to skip:'
-                                )
-                                .strip()
-                                .strip('"')
-                            )
-                            if new_location == "s":
-                                new_location = None
-                                break
-                            if os.path.isdir(new_location):
-                                new_dir = new_location
-                                new_location = os.path.join(new_dir, os.path.basename(track_path))
-                            if os.path.exists(new_location):
-                                break
-                    if new_location:
-                        print("   new_location: " + new_location)
-                        track.set_path(new_location)
-                value = track.to_entries()
-            new_entries.append((field, value))
-        self.entries = new_entries
+        for i in positions:
+            self._modify_track_at(i, set_path)
         self._dump()
+
+    class MissingReport(TypedDict):
+        checked: int
+        """ number of tracks checked """
+        missing: dict[str, list[str]]
+        """ relative path of each missing track -> full paths of files with the same name under `search_roots` """
+
+    def scan_missing(
+        self, search_roots: Optional[Iterable[str]] = None, max_workers: Optional[int] = None
+    ) -> MissingReport:
+        """
+        Finds the tracks whose files do not exist, without prompting. Each directory is listed once (concurrently, see
+        `DirListingCache`), rather than checking each file on its own.
+
+        search_roots: directories to look for missing files in, by filename (see `BasenameIndex`). Only indexed if any
+        track is missing.
+        max_workers: size of the thread pools.
+        """
+        relpaths = self.get_track_paths()
+        exists = DirListingCache(max_workers=max_workers).check(SeratoBinFile.get_full_path(p) for p in relpaths)
+        missing = [relpath for relpath, found in zip(relpaths, exists.values()) if not found]
+
+        index = BasenameIndex(search_roots, max_workers=max_workers) if missing and search_roots else None
+        report: SeratoBinFile.MissingReport = {
+            "checked": len(relpaths),
+            "missing": {relpath: index.find(relpath) if index else [] for relpath in missing},
+        }
+        logger.info(f"{len(report['missing'])} of {report['checked']} tracks missing")
+        return report
+
+    def find_missing(self, search_roots: Optional[Iterable[str]] = None):
+        """
+        Prompts for the new location of each missing track, and saves. A file found under `search_roots` (see
+        `scan_missing`), or with the same name in the last directory entered, is used without prompting.
+        """
+        new_locations: dict[str, str] = {}
+        new_dir: str | None = None
+        for relpath, candidates in self.scan_missing(search_roots)["missing"].items():
+            track_path = SeratoBinFile.get_full_path(relpath)
+            print(f"missing: {track_path}")
+            new_location = None
+            if len(candidates) == 1:
+                new_location = candidates[0]
+            elif new_dir is not None:
+                possible_new_loc = os.path.join(new_dir, os.path.basename(track_path))
+                if os.path.isfile(possible_new_loc):
+                    new_location = possible_new_loc
+            if not new_location:
+                for candidate in candidates:
+                    print(f"   found: {candidate}")
+                while True:
+                    new_location = os.path.normpath(
+                        input('enter new location of file, or directory to look for missing files, or "s" to skip:')
+                        .strip()
+                        .strip('"')
+                    )
+                    if new_location == "s":
+                        new_location = None
+                        break
+                    if os.path.isdir(new_location):
+                        new_dir = new_location
+                        new_location = os.path.join(new_dir, os.path.basename(track_path))
+                    if os.path.exists(new_location):
+                        break
+            if new_location:
+                print("   new_location: " + new_location)
+                new_locations[relpath] = new_location
+
+        if not new_locations:
+            return
+
+        def set_new_location(track: SeratoBinFile.Track) -> SeratoBinFile.Track:
+            if track.relpath in new_locations:
+                track.set_path(new_locations[track.relpath])
+            return track
+
+        self.modify_tracks(set_new_location)
         self.save()
@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import hashlib
+from typing import Any, Generator, Optional
+
+if __package__ is None:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from serato_tools.utils.bin_file_base import SeratoBinFile
+from serato_tools.utils import logger
+
+# pylint: disable=protected-access
+
+
+class BinFileDiff:
+    """
+    Record-level difference between two versions of a database or crate file: the tracks that were added, removed or
+    changed, keyed by track path (not case-sensitive, like `has_track`). If a path is in a file more than once, only
+    its first track is compared.
+
+    Neither file is loaded: the tracks of the old file are hashed into a dict of path -> digest, and the tracks of the
+    new file are looked up in it as they are read (a hash join). Only the tracks that differ are decoded.
+
+    Entries that are not tracks (i.e. the version) are not compared.
+    """
+
+    PATCH_VERSION = 1
+
+    type FieldChanges = dict[str, tuple[SeratoBinFile.ValueOrNone, SeratoBinFile.ValueOrNone]]
+    """ field -> (old value, new value). None if the track does not have the field on that side. """
+
+    def __init__(
+        self,
+        path_key: str,
+        added: Optional[dict[str, SeratoBinFile.EntryList]] = None,
+        removed: Optional[list[str]] = None,
+        changed: Optional[dict[str, FieldChanges]] = None,
+    ):
+        self.path_key = path_key
+        self.added: dict[str, SeratoBinFile.EntryList] = added or {}
+        """ track path -> entries of the new track """
+        self.removed: list[str] = removed or []
+        """ track paths """
+        self.changed: dict[str, BinFileDiff.FieldChanges] = changed or {}
+        """ track path -> changed fields """
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def __str__(self) -> str:
+        lines = [f"+ {path}" for path in self.added] + [f"- {path}" for path in self.removed]
+        for path, fields in self.changed.items():
+            lines.append(f"~ {path}")
+            for field, (old, new) in fields.items():
+                lines.append(f"    {field} ({SeratoBinFile.get_field_name(field)}): {old!r} -> {new!r}")
+        lines.append(f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _iter_file_tracks(
+        file_cls: type[SeratoBinFile], file: str
+    ) -> Generator[tuple[str, SeratoBinFile.LazyTrack, bytes], None, None]:
+        """Yields (track key, track, digest) for the first track of each path in `file`."""
+        seen: set[str] = set()
+        with open(file, "rb", buffering=SeratoBinFile.WRITE_BUFFER_SIZE) as f:
+            for field, item in SeratoBinFile._iter_file_items(f):
+                if field != SeratoBinFile.Fields.TRACK:
+                    continue
+                track = file_cls._get_file_track(item)
+                key = SeratoBinFile._get_track_key(track.relpath)
+                if key in seen:
+                    continue
+                seen.add(key)
+                yield key, track, hashlib.blake2b(item, digest_size=16).digest()
+
+    @staticmethod
+    def _diff_fields(old: SeratoBinFile.EntryList, new: SeratoBinFile.EntryList) -> "BinFileDiff.FieldChanges":
+        old_values = dict(old)
+        new_values = dict(new)
+        changes: BinFileDiff.FieldChanges = {
+            field: (old_values.get(field), value)
+            for field, value in new_values.items()
+            if field not in old_values or old_values[field] != value or type(old_values[field]) is not type(value)
+        }
+        for field, value in old_values.items():
+            if field not in new_values:
+                changes[field] = (value, None)
+        return changes
+
+    @staticmethod
+    def from_files(file_cls: type[SeratoBinFile], old_file: str, new_file: str) -> "BinFileDiff":
+        """file_cls: the class of both files, i.e. `DatabaseV2`, for its track path field."""
+        old_tracks: dict[str, tuple[str, bytes]] = {}  # key -> (path, digest)
+        for key, track, digest in BinFileDiff._iter_file_tracks(file_cls, old_file):
+            old_tracks[key] = (track.relpath, digest)
+
+        diff = BinFileDiff(file_cls.TRACK_PATH_KEY)
+        changed_new: dict[str, tuple[str, SeratoBinFile.EntryList]] = {}
+        for key, track, digest in BinFileDiff._iter_file_tracks(file_cls, new_file):
+            old = old_tracks.pop(key, None)
+            if old is None:
+                diff.added[track.relpath] = track.to_entries()
+            elif old[1] != digest:
+                changed_new[key] = (track.relpath, track.to_entries())
+        diff.removed = [path for path, _ in old_tracks.values()]
+
+        if changed_new:
+            for key, track, _ in BinFileDiff._iter_file_tracks(file_cls, old_file):
+                if key in changed_new:
+                    path, new_entries = changed_new[key]
+                    changes = BinFileDiff._diff_fields(track.to_entries(), new_entries)
+                    if changes:  # not just reordered
+                        diff.changed[path] = changes
+        return diff
+
+    def to_patch(self) -> dict[str, Any]:
+        return {
+            "version": BinFileDiff.PATCH_VERSION,
+            "path_key": self.path_key,
+            "added": [[[field, value] for field, value in entries] for entries in self.added.values()],
+            "removed": self.removed,
+            "changed": {
+                path: {field: [old, new] for field, (old, new) in fields.items()}
+                for path, fields in self.changed.items()
+            },
+        }
+
+    @staticmethod
+    def from_patch(patch: dict[str, Any]) -> "BinFileDiff":
+        if patch.get("version") != BinFileDiff.PATCH_VERSION:
+            raise ValueError(f"unsupported patch version: {patch.get('version')}")
+        path_key = patch["path_key"]
+        added: dict[str, SeratoBinFile.EntryList] = {}
+        for entries in patch["added"]:
+            track = SeratoBinFile.Track([(field, value) for field, value in entries], path_key=path_key)
+            added[track.relpath] = track.to_entries()
+        changed = {
+            path: {field: (old, new) for field, (old, new) in fields.items()}
+            for path, fields in patch["changed"].items()
+        }
+        return BinFileDiff(path_key, added=added, removed=list(patch["removed"]), changed=changed)
+
+    def write_patch(self, filepath: str):
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(self.to_patch(), f, ensure_ascii=False, separators=(",", ":"))
+
+    @staticmethod
+    def read_patch(filepath: str) -> "BinFileDiff":
+        with open(filepath, "r", encoding="utf-8") as f:
+            return BinFileDiff.from_patch(json.load(f))
+
+    def apply(self, file: SeratoBinFile):
+        """
+        Applies the changes to `file`, in a single pass over its tracks. Tracks that are removed or changed but not in
+        `file`, and added tracks that already are, are skipped with a warning.
+        """
+        if file.TRACK_PATH_KEY != self.path_key:
+            raise ValueError(f"patch is for files with track path {self.path_key}, not {file.TRACK_PATH_KEY}")
+        get_key = SeratoBinFile._get_track_key
+        removed = {get_key(path): path for path in self.removed}
+        changed = {get_key(path): (path, fields) for path, fields in self.changed.items()}
+        found: set[str] = set()
+
+        def filter_track(track: SeratoBinFile.Track) -> bool:
+            key = get_key(track.relpath)
+            if key in removed:
+                found.add(key)
+                return False
+            return True
+
+        def modify_track(track: SeratoBinFile.Track) -> SeratoBinFile.Track:
+            key = get_key(track.relpath)
+            if key not in changed or key in found:
+                return track
+            found.add(key)
+            fields = changed[key][1]
+            entries = [(field, fields[field][1] if field in fields else value) for field, value in track.to_entries()]
+            present = {field for field, _ in entries}
+            entries += [(field, new) for field, (_, new) in fields.items() if field not in present]
+            return SeratoBinFile.Track(
+                [(field, value) for field, value in entries if value is not None], path_key=self.path_key
+            )
+
+        with file.batch():
+            file.filter_tracks(filter_track)
+            file.modify_tracks(modify_track)
+            for path, entries in self.added.items():
+                if file.has_track(path, case_sensitive=False):
+                    logger.warning(f"not adding track, already exists: {path}")
+                else:
+                    file._append_track(list(entries))
+
+        for key, path in removed.items():
+            if key not in found:
+                logger.warning(f"not removing track, does not exist: {path}")
+        for key, (path, _) in changed.items():
+            if key not in found:
+                logger.warning(f"not changing track, does not exist: {path}")
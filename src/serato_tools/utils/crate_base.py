@@ -57,18 +57,17 @@ class CrateBase(SeratoBinFile):
         # filepath name must include the containing dir
         filepath = self.get_relative_path(filepath)
 
-        if filepath in self.get_track_paths():
+        if self.has_track(filepath):
             return
 
-        self.entries.append((CrateBase.Fields.TRACK, [(CrateBase.Fields.TRACK_PATH, filepath)]))
+        self._append_track([(CrateBase.Fields.TRACK_PATH, filepath)])
 
     def add_tracks_from_dir(self, dir: str, replace: bool = False):
         dir_tracks = [self.get_relative_path(os.path.join(dir, t)) for t in os.listdir(dir)]
 
         if replace:
-            for track in self.get_track_paths():
-                if track not in dir_tracks:
-                    self.remove_track(track)
+            dir_tracks_set = set(dir_tracks)
+            self.filter_tracks(lambda track: track.relpath in dir_tracks_set)
 
         for track in dir_tracks:
             self.add_track(track)
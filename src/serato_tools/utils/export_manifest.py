@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import uuid
+import hashlib
+from typing import NotRequired, Optional, TypedDict
+
+if __package__ is None:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from serato_tools.utils import logger
+
+
+class ExportManifest:
+    """
+    What a previous export wrote to a drive: each copied file with the size and modification time of its source,
+    and a digest of each written database and crate file. Kept on the drive, so that the next export only copies the
+    files whose source changed, without reading anything on the drive, and only rewrites the crates that changed.
+
+    Paths are relative to the drive, so they do not depend on where it is mounted.
+    """
+
+    VERSION = 1
+    FILENAME = "serato_tools_export.json"
+
+    class FileInfo(TypedDict):
+        src: str
+        size: int
+        mtime_ns: int
+        hash: NotRequired[str]
+        """ of the source, if exported with `hash_files` """
+
+    def __init__(self, drive_dir: str, serato_dir: str, load: bool = True):
+        """
+        serato_dir: where the manifest is kept, on the drive.
+        load: read the manifest of the previous export, if any. Otherwise, start empty.
+        """
+        self.drive_dir = drive_dir
+        self.filepath = os.path.join(serato_dir, ExportManifest.FILENAME)
+        self.files: dict[str, ExportManifest.FileInfo] = {}
+        """ copied file -> its source """
+        self.data_files: dict[str, str] = {}
+        """ written database or crate file -> digest of its data """
+
+        if load and os.path.exists(self.filepath):
+            try:
+                with open(self.filepath, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == ExportManifest.VERSION:
+                    self.files = data["files"]
+                    self.data_files = data["data_files"]
+            except (ValueError, KeyError, AttributeError) as e:
+                logger.warning(f"ignoring invalid export manifest {self.filepath}: {e}")
+
+    def _key(self, path: str) -> str:
+        return os.path.relpath(path, self.drive_dir).replace(os.path.sep, "/")
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.drive_dir, *key.split("/"))
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def is_unchanged(self, src: str, dest: str, src_stat: os.stat_result, hash_files: bool = False) -> bool:
+        """
+        True if `dest` was exported from `src`, and `src` did not change since. Only looks at the source.
+
+        hash_files: if the modification time changed but not the size, compare the content instead.
+        """
+        info = self.files.get(self._key(dest))
+        if info is None or info["src"] != src or info["size"] != src_stat.st_size:
+            return False
+        if info["mtime_ns"] == src_stat.st_mtime_ns:
+            return True
+        if hash_files and "hash" in info and ExportManifest.hash_file(src) == info["hash"]:
+            info["mtime_ns"] = src_stat.st_mtime_ns
+            return True
+        return False
+
+    def add_file(self, src: str, dest: str, src_stat: os.stat_result, hash_files: bool = False):
+        info: ExportManifest.FileInfo = {"src": src, "size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+        if hash_files:
+            info["hash"] = ExportManifest.hash_file(src)
+        self.files[self._key(dest)] = info
+
+    def remove(self, path: str):
+        key = self._key(path)
+        self.files.pop(key, None)
+        self.data_files.pop(key, None)
+
+    @staticmethod
+    def _get_digest(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def is_data_unchanged(self, path: str, data: bytes) -> bool:
+        """True if `data` is what was written to `path` last time, and `path` still exists."""
+        return self.data_files.get(self._key(path)) == ExportManifest._get_digest(data) and os.path.isfile(path)
+
+    def write_data_file(self, path: str, data: bytes) -> bool:
+        """Writes `data` to `path` unless it is what was written there last time. Returns whether it was written."""
+        if self.is_data_unchanged(path, data):
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_file = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_file, "wb") as f:
+            f.write(data)
+        os.replace(temp_file, path)
+        self.data_files[self._key(path)] = ExportManifest._get_digest(data)
+        return True
+
+    def get_stale(self, exported: set[str]) -> list[str]:
+        """The paths in the manifest that are not in `exported`, i.e. to delete from the drive."""
+        keys = {self._key(path) for path in exported}
+        return [self.get_path(key) for key in [*self.files, *self.data_files] if key not in keys]
+
+    def save(self, file: Optional[str] = None):
+        file = file or self.filepath
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        temp_file = f"{file}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"version": ExportManifest.VERSION, "files": self.files, "data_files": self.data_files}, f)
+        os.replace(temp_file, file)
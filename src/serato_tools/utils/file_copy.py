@@ -0,0 +1,385 @@
+import os
+import sys
+import time
+import errno
+import queue
+import shutil
+import filecmp
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Iterable, Optional, TypedDict
+
+if __package__ is None:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from serato_tools.utils import logger
+
+
+class CopyProgress:
+    """Bytes copied so far, out of a total. Thread-safe. Prints the throughput and ETA, at most every `interval` s."""
+
+    def __init__(self, total_bytes: int, interval: float = 0.5, show: bool = True):
+        self.total_bytes = total_bytes
+        self.copied_bytes = 0
+        self.interval = interval
+        self.show = show
+        self._start = time.monotonic()
+        self._last_shown = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, n_bytes: int):
+        with self._lock:
+            self.copied_bytes += n_bytes
+            now = time.monotonic()
+            if self.show and now - self._last_shown >= self.interval:
+                self._last_shown = now
+                print(self.get_status(), end="\r", flush=True)
+
+    def skip(self, n_bytes: int):
+        """For a file that did not need copying: no longer part of the total, and not counted as throughput."""
+        with self._lock:
+            self.total_bytes -= n_bytes
+
+    def get_rate(self) -> float:
+        """bytes/s"""
+        elapsed = time.monotonic() - self._start
+        return self.copied_bytes / elapsed if elapsed > 0 else 0.0
+
+    def get_status(self) -> str:
+        rate = self.get_rate()
+        percent = self.copied_bytes / self.total_bytes * 100 if self.total_bytes else 100.0
+        eta = (self.total_bytes - self.copied_bytes) / rate if rate > 0 else 0.0
+        return (
+            f"{percent:.1f}% {self.copied_bytes / 1e6:,.0f}/{self.total_bytes / 1e6:,.0f} MB"
+            f" {rate / 1e6:.1f} MB/s ETA {int(eta // 60)}:{int(eta % 60):02d}"
+        )
+
+    def finish(self):
+        if self.show:
+            print(self.get_status())
+
+
+class CopyResult(TypedDict):
+    copied: list[str]
+    """ destination files that were written """
+    skipped: list[str]
+    """ destination files that were already the same as their source """
+    not_found: list[str]
+    """ source files that do not exist """
+    failed: list[str]
+    """ destination files that could not be written, see `FileCopier.copy_files_to_targets` """
+    copied_bytes: int
+    seconds: float
+
+
+class FileCopier:
+    """
+    Copies files concurrently, with a bounded thread pool. A few copies at once keep a USB drive busy: while one
+    thread waits on the device, another reads its next source file.
+
+    Each file is copied in the kernel where possible (`os.copy_file_range`, then `os.sendfile` on Linux), otherwise
+    with large buffers, and is written to a temporary file that is renamed once complete, so a destination file is
+    never partially written.
+    """
+
+    DEFAULT_WORKERS = 4
+    BUFFER_SIZE = 8 * 1024 * 1024
+    PART_SUFFIX = ".part"
+
+    MAX_BUFFER = 8 * BUFFER_SIZE
+    """ per target, see `copy_files_to_targets` """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, buffer_size: int = BUFFER_SIZE, max_buffer: int = MAX_BUFFER):
+        self.max_workers = max_workers
+        self.buffer_size = buffer_size
+        self.max_buffer = max_buffer
+
+    @staticmethod
+    def is_same(src: str, dest: str) -> bool:
+        """Same as `filecmp.cmp(shallow=True)`, False if `dest` does not exist."""
+        try:
+            return filecmp.cmp(src, dest, shallow=True)
+        except FileNotFoundError:
+            return False
+
+    def _copy_data(self, src_fd: int, dest_fd: int, on_progress: Callable[[int], None]):
+        copied = 0
+        if hasattr(os, "copy_file_range"):
+            try:
+                while n := os.copy_file_range(src_fd, dest_fd, self.buffer_size):
+                    copied += n
+                    on_progress(n)
+                return
+            except OSError as e:
+                # i.e. not supported across filesystems, or by the filesystem
+                if copied or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM):
+                    raise
+        if sys.platform == "linux":
+            try:
+                while n := os.sendfile(dest_fd, src_fd, None, self.buffer_size):
+                    copied += n
+                    on_progress(n)
+                return
+            except OSError as e:
+                if copied or e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+        view = memoryview(bytearray(self.buffer_size))
+        with open(src_fd, "rb", buffering=0, closefd=False) as src_f, open(dest_fd, "wb", closefd=False) as dest_f:
+            while n := src_f.readinto(view):
+                dest_f.write(view[:n])
+                on_progress(n)
+
+    def copy_file(self, src: str, dest: str, on_progress: Optional[Callable[[int], None]] = None):
+        """Copies `src` to `dest`, with its modification time (like `shutil.copy2`)."""
+        part_file = dest + FileCopier.PART_SUFFIX
+        flags = getattr(os, "O_BINARY", 0)
+        src_fd = os.open(src, os.O_RDONLY | flags)
+        try:
+            dest_fd = os.open(part_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | flags, 0o666)
+            try:
+                self._copy_data(src_fd, dest_fd, on_progress or (lambda n: None))
+            finally:
+                os.close(dest_fd)
+            shutil.copystat(src, part_file)
+            os.replace(part_file, dest)
+        except BaseException:
+            if os.path.exists(part_file):
+                os.remove(part_file)
+            raise
+        finally:
+            os.close(src_fd)
+
+    def copy_files(self, files: Iterable[tuple[str, str]], skip_same: bool = True, show_progress: bool = True) -> CopyResult:
+        """
+        Copies each (source, destination) pair concurrently, creating the destination directories.
+
+        skip_same: do not copy files that are the same as their destination already, see `is_same`.
+        """
+        files = list(files)
+        sizes: dict[str, int] = {}
+        not_found: list[str] = []
+        for src, _ in files:
+            try:
+                sizes[src] = os.path.getsize(src)
+            except OSError:
+                not_found.append(src)
+        files = [(src, dest) for src, dest in files if src in sizes]
+
+        for dest_dir in {os.path.dirname(dest) for _, dest in files}:
+            os.makedirs(dest_dir, exist_ok=True)
+
+        progress = CopyProgress(sum(sizes.values()), show=show_progress)
+
+        def copy(src: str, dest: str) -> bool:
+            if skip_same and FileCopier.is_same(src, dest):
+                progress.skip(sizes[src])
+                return False
+            logger.info(f"copying {src}")
+            self.copy_file(src, dest, progress.add)
+            return True
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            copied = list(executor.map(lambda file: copy(*file), files))
+        progress.finish()
+
+        return {
+            "copied": [dest for (_, dest), was_copied in zip(files, copied) if was_copied],
+            "skipped": [dest for (_, dest), was_copied in zip(files, copied) if not was_copied],
+            "not_found": not_found,
+            "failed": [],
+            "copied_bytes": progress.copied_bytes,
+            "seconds": time.monotonic() - start,
+        }
+
+    def copy_files_to_targets(
+        self, targets: dict[str, Iterable[tuple[str, str]]], show_progress: bool = True
+    ) -> dict[str, CopyResult]:
+        """
+        Copies files to several targets (i.e. drives) at once, reading each source file only once: each chunk that is
+        read is handed to a writer thread per target, which writes it at the pace of its target.
+
+        Up to `max_buffer` bytes are buffered per target. A target that falls further behind (i.e. a slower drive) is
+        waited for only as long as the other targets have data left to write: then it copies the rest of that file
+        itself, reading it again, while the other targets carry on. A target that fails to write a file (i.e. it was
+        unplugged) does not stop the others.
+
+        targets: target -> the (source, destination) pairs to copy to it. Returns the result of each target.
+        """
+        start = time.monotonic()
+        sources: dict[str, dict[str, str]] = {}  # source -> target -> destination
+        for target, files in targets.items():
+            for src, dest in files:
+                sources.setdefault(src, {})[target] = dest
+
+        sizes: dict[str, int] = {}
+        not_found: list[str] = []
+        for src in sources:
+            try:
+                sizes[src] = os.path.getsize(src)
+            except OSError:
+                not_found.append(src)
+        for dest_dir in {os.path.dirname(dest) for src in sizes for dest in sources[src].values()}:
+            os.makedirs(dest_dir, exist_ok=True)
+
+        progress = CopyProgress(sum(sizes[src] * len(sources[src]) for src in sizes), show=show_progress)
+        cond = threading.Condition()
+        writers = {target: _TargetWriter(self, progress, start, cond) for target in targets}
+        for src in not_found:
+            for target in sources[src]:
+                writers[target].result["not_found"].append(src)
+        for writer in writers.values():
+            writer.start()
+
+        try:
+            for src in sizes:
+                self._fan_out_file(src, {writers[target]: dest for target, dest in sources[src].items()})
+        finally:
+            for writer in writers.values():
+                writer.put(("stop",))
+            for writer in writers.values():
+                writer.join()
+        progress.finish()
+        return {target: writer.result for target, writer in writers.items()}
+
+    def _fan_out_file(self, src: str, dests: "dict[_TargetWriter, str]"):
+        attached = list(dests)
+        for writer in attached:
+            writer.put(("open", src, dests[writer]))
+        offset = 0
+        try:
+            with open(src, "rb", buffering=0) as f:
+                while chunk := f.read(self.buffer_size):
+                    for writer in list(attached):
+                        if not writer.reserve(len(chunk), attached):
+                            writer.put(("rest", offset))  # copies the rest itself
+                            attached.remove(writer)
+                        else:
+                            writer.put(("data", chunk))
+                    offset += len(chunk)
+        except OSError as e:
+            logger.error(f"could not read {src}: {e}")
+            for writer in attached:
+                writer.put(("abort",))
+            return
+        for writer in attached:
+            writer.put(("close",))
+
+
+class _TargetWriter(threading.Thread):
+    """A target of `FileCopier.copy_files_to_targets`: writes the chunks it is handed, in order, on its own thread."""
+
+    def __init__(self, copier: FileCopier, progress: CopyProgress, start: float, cond: threading.Condition):
+        """cond: shared by all targets, notified when one of them writes a chunk."""
+        super().__init__(daemon=True)
+        self.copier = copier
+        self.progress = progress
+        self.start_time = start
+        self.result: CopyResult = {
+            "copied": [],
+            "skipped": [],
+            "not_found": [],
+            "failed": [],
+            "copied_bytes": 0,
+            "seconds": 0.0,
+        }
+        self._queue: queue.SimpleQueue[tuple[Any, ...]] = queue.SimpleQueue()
+        self.buffered = 0
+        """ bytes handed to this target, not written yet """
+        self._cond = cond
+        self._src = ""
+        self._dest = ""
+        self._f: Optional[BinaryIO] = None
+        self._part_file: Optional[str] = None
+
+    def put(self, message: tuple[Any, ...]):
+        self._queue.put(message)
+
+    def reserve(self, n_bytes: int, others: "list[_TargetWriter]") -> bool:
+        """
+        Counts `n_bytes` as buffered for this target. While that would be more than `max_buffer`, waits for the target
+        to catch up, unless one of `others` (the other targets of the file) runs out of data to write meanwhile: then
+        returns False, so as not to stall it.
+        """
+        with self._cond:
+            while self.buffered + n_bytes > self.copier.max_buffer:
+                starving = any(other is not self and other.buffered < self.copier.buffer_size for other in others)
+                if starving or not self.is_alive():
+                    return False
+                self._cond.wait(timeout=1.0)
+            self.buffered += n_bytes
+            return True
+
+    def _add(self, n_bytes: int):
+        self.result["copied_bytes"] += n_bytes
+        self.progress.add(n_bytes)
+
+    def _discard(self):
+        f, part_file = self._f, self._part_file
+        self._f = self._part_file = None
+        if f is not None:
+            f.close()
+        if part_file is not None and os.path.exists(part_file):
+            os.remove(part_file)
+
+    def _open(self):
+        logger.info(f"copying {self._src} to {self._dest}")
+        self._part_file = self._dest + FileCopier.PART_SUFFIX
+        self._f = open(self._part_file, "wb")  # pylint: disable=consider-using-with
+
+    def _write(self, chunk: bytes):
+        if self._f is not None:
+            self._f.write(chunk)
+            self._add(len(chunk))
+
+    def _close(self, rest_offset: Optional[int] = None):
+        if self._f is None:
+            return
+        if rest_offset is not None:
+            self._f.flush()
+            src_fd = os.open(self._src, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+            try:
+                os.lseek(src_fd, rest_offset, os.SEEK_SET)
+                self.copier._copy_data(src_fd, self._f.fileno(), self._add)  # pylint: disable=protected-access
+            finally:
+                os.close(src_fd)
+        self._f.close()
+        self._f = None
+        assert self._part_file is not None
+        shutil.copystat(self._src, self._part_file)
+        os.replace(self._part_file, self._dest)
+        self._part_file = None
+        self.result["copied"].append(self._dest)
+
+    def run(self):
+        while True:
+            message = self._queue.get()
+            kind = message[0]
+            if kind == "stop":
+                break
+            try:
+                if kind == "open":
+                    _, self._src, self._dest = message
+                    self._open()
+                elif kind == "data":
+                    try:
+                        self._write(message[1])
+                    finally:
+                        with self._cond:
+                            self.buffered -= len(message[1])
+                            self._cond.notify_all()
+                elif kind == "close":
+                    self._close()
+                elif kind == "rest":
+                    self._close(rest_offset=message[1])
+                elif kind == "abort":
+                    self._discard()
+            except OSError as e:
+                logger.error(f"could not write {self._dest}: {e}")
+                self.result["failed"].append(self._dest)
+                try:
+                    self._discard()
+                except OSError:
+                    self._f = None
+        self._discard()
+        self.result["seconds"] = time.monotonic() - self.start_time
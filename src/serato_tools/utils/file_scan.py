@@ -0,0 +1,192 @@
+import os
+import sys
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+if __package__ is None:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from serato_tools.utils import logger
+
+
+class DirListingCache:
+    """
+    Checks whether files exist from a listing of their directory, so that checking many files costs one listing per
+    directory instead of one stat call per file. Directories are listed concurrently, which is what makes the
+    difference on network drives.
+    """
+
+    type Listing = tuple[frozenset[str], frozenset[str]]
+    """ (names of the files in the directory, the same casefolded) """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """max_workers: size of the thread pool that lists directories. Default: see `ThreadPoolExecutor`."""
+        self.max_workers = max_workers
+        self._listings: dict[str, DirListingCache.Listing | None] = {}
+        """ directory -> listing, or None if it could not be listed """
+
+    @staticmethod
+    def _list_dir(dirpath: str) -> "DirListingCache.Listing | None":
+        try:
+            with os.scandir(dirpath) as it:
+                names = frozenset(entry.name for entry in it if entry.is_file())
+        except (FileNotFoundError, NotADirectoryError):
+            names = frozenset()
+        except OSError as e:
+            logger.debug(f"could not list {dirpath}, checking its files one by one: {e}")
+            return None
+        return names, frozenset(name.casefold() for name in names)
+
+    def prefetch(self, dirpaths: Iterable[str]):
+        """Lists the directories that are not listed yet, concurrently."""
+        todo = list({os.path.normpath(d) for d in dirpaths} - set(self._listings))
+        if not todo:
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self._listings.update(zip(todo, executor.map(DirListingCache._list_dir, todo)))
+
+    def isfile(self, path: str) -> bool:
+        """Same as `os.path.isfile`. Lists the directory of `path` if it was not listed yet."""
+        dirpath, name = os.path.split(os.path.normpath(path))
+        if dirpath not in self._listings:
+            self._listings[dirpath] = DirListingCache._list_dir(dirpath)
+        listing = self._listings[dirpath]
+        if listing is None:
+            return os.path.isfile(path)
+        names, casefolded = listing
+        if name in names:
+            return True
+        if name.casefold() in casefolded:
+            # different case: exists on a case-insensitive filesystem only
+            return os.path.isfile(path)
+        return False
+
+    def check(self, paths: Iterable[str]) -> dict[str, bool]:
+        """`isfile` of each path, listing all of their directories up front."""
+        paths = list(paths)
+        self.prefetch(os.path.dirname(path) for path in paths)
+        return {path: self.isfile(path) for path in paths}
+
+
+class BasenameIndex:
+    """
+    The files under some directories (i.e. the drives or folders a library may have moved to), by filename. Used to
+    suggest new locations for missing files without looking in each directory.
+    """
+
+    WITH_SIZES = False
+    """ read the size of each file while walking """
+
+    def __init__(self, roots: Iterable[str], max_workers: Optional[int] = None):
+        """
+        roots: directories to index, recursively.
+        max_workers: size of the thread pool, which walks the subdirectories of each root concurrently.
+        """
+        self.roots = [os.path.abspath(root) for root in roots]
+        self._paths: dict[str, list[str]] = {}
+        """ casefolded filename -> full paths """
+        self._sizes: dict[str, int] = {}
+
+        tops: list[str] = []
+        for root in self.roots:
+            try:
+                self._add_files(self._scan_dir(root, tops))
+            except OSError as e:
+                logger.warning(f"could not index {root}: {e}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for files in executor.map(self._walk, tops):
+                self._add_files(files)
+
+    def _scan_dir(self, dirpath: str, subdirs: list[str]) -> list[tuple[str, int]]:
+        """Returns the (path, size) of the files in `dirpath`, size -1 if not read. Appends its directories to `subdirs`."""
+        files: list[tuple[str, int]] = []
+        with os.scandir(dirpath) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    files.append((entry.path, entry.stat().st_size if self.WITH_SIZES else -1))
+        return files
+
+    def _walk(self, top: str) -> list[tuple[str, int]]:
+        files: list[tuple[str, int]] = []
+        dirs = [top]
+        while dirs:
+            dirpath = dirs.pop()
+            try:
+                files += self._scan_dir(dirpath, dirs)
+            except OSError as e:
+                logger.debug(f"could not index {dirpath}: {e}")
+        return files
+
+    def _add_files(self, files: list[tuple[str, int]]):
+        for path, size in files:
+            self._paths.setdefault(os.path.basename(path).casefold(), []).append(path)
+            if size >= 0:
+                self._sizes[path] = size
+
+    def __len__(self) -> int:
+        return sum(len(paths) for paths in self._paths.values())
+
+    def find(self, filename: str) -> list[str]:
+        """Full paths of the indexed files named `filename` (or the filename of a path). Not case-sensitive."""
+        return list(self._paths.get(os.path.basename(filename).casefold(), []))
+
+
+class RelocationIndex(BasenameIndex):
+    """
+    `BasenameIndex` that also tells apart files with the same name, to pick the new location of a moved file: by
+    size, and optionally by a hash of the start and end of each file, so that identical copies count as one match.
+    Sizes are read while walking, hashes only for files that share a name.
+    """
+
+    WITH_SIZES = True
+
+    PARTIAL_HASH_SIZE = 64 * 1024
+    """ bytes hashed from the start and from the end of a file """
+
+    def __init__(self, roots: Iterable[str], hash_files: bool = False, max_workers: Optional[int] = None):
+        """hash_files: treat files with the same name, size and partial hash as copies of one file."""
+        self.hash_files = hash_files
+        self._hashes: dict[str, bytes | None] = {}
+        super().__init__(roots, max_workers=max_workers)
+
+    def get_size(self, path: str) -> int | None:
+        return self._sizes.get(path)
+
+    def _get_partial_hash(self, path: str) -> bytes | None:
+        if path not in self._hashes:
+            digest = hashlib.blake2b(digest_size=16)
+            try:
+                with open(path, "rb") as f:
+                    digest.update(f.read(RelocationIndex.PARTIAL_HASH_SIZE))
+                    if self._sizes.get(path, 0) > 2 * RelocationIndex.PARTIAL_HASH_SIZE:
+                        f.seek(-RelocationIndex.PARTIAL_HASH_SIZE, os.SEEK_END)
+                        digest.update(f.read())
+                self._hashes[path] = digest.digest()
+            except OSError:
+                self._hashes[path] = None
+        return self._hashes[path]
+
+    def match(self, filename: str, size: Optional[int] = None, size_tolerance: float = 0.0) -> list[str]:
+        """
+        The indexed files that `filename` may have moved to. A single result is a confident match.
+
+        size: the expected size of the file, if known. Only used to narrow down files with the same name.
+        size_tolerance: relative, for a size that is rounded (i.e. 0.05 for 5%).
+        """
+        candidates = self.find(filename)
+        if len(candidates) > 1 and size is not None:
+            close = [
+                path
+                for path in candidates
+                if path in self._sizes and abs(self._sizes[path] - size) <= size * size_tolerance
+            ]
+            if close:
+                candidates = close
+        if len(candidates) > 1 and self.hash_files:
+            keys = {(self._sizes.get(path), self._get_partial_hash(path)) for path in candidates}
+            if len(keys) == 1 and None not in next(iter(keys)):
+                return candidates[:1]  # copies of the same file
+        return candidates
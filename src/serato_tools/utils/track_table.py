@@ -0,0 +1,140 @@
+import os
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Sequence
+
+if __package__ is None:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from serato_tools.utils.bin_file_base import SeratoBinFile
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _get_numpy():
+    try:
+        import numpy
+
+        return numpy
+    except ImportError:
+        return None
+
+
+class TrackTable:
+    """
+    Columnar view of the tracks of a database or crate: one column per field, holding the value of each track (None if
+    the track does not have the field). Filtering, sorting and grouping work on whole columns rather than on a `Track`
+    object per track, and use NumPy if it is installed.
+
+    A table is a snapshot. Changes go back to the file, through its entries, with `set_values()`.
+    """
+
+    def __init__(
+        self, file: SeratoBinFile, positions: list[int], columns: "dict[str, list[SeratoBinFile.Value | None]]"
+    ):
+        self.file = file
+        self.positions = positions
+        """ position of each track in `file.entries` """
+        self.columns = columns
+
+    @staticmethod
+    def from_file(file: SeratoBinFile, fields: Iterable[str]) -> "TrackTable":
+        """fields: the columns to read. The track path is always included."""
+        fields = list(dict.fromkeys([file.TRACK_PATH_KEY, *fields]))
+        positions, columns = file._get_track_columns(fields)  # pylint: disable=protected-access
+        return TrackTable(file, positions, columns)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __repr__(self) -> str:
+        return f"TrackTable({len(self)} tracks, fields={[str(field) for field in self.columns]})"
+
+    def column(self, field: str) -> "list[SeratoBinFile.Value | None]":
+        return self.columns[field]
+
+    def array(self, field: str, dtype: Any = None) -> "np.ndarray":
+        """
+        The column as a NumPy array. With a numeric `dtype`, missing values are NaN, and text values are converted
+        (i.e. `array(DatabaseV2.Fields.BPM, float)`). Requires NumPy.
+        """
+        np = _get_numpy()
+        if np is None:
+            raise ImportError("numpy is required for TrackTable.array, install with `pip install numpy`")
+        column = self.columns[field]
+        if dtype is not None and np.issubdtype(np.dtype(dtype), np.number):
+            return np.array([np.nan if v is None or v == "" else v for v in column], dtype=dtype)
+        return np.array(column, dtype=dtype if dtype is not None else object)
+
+    def valid(self, field: str) -> Sequence[bool]:
+        """Mask of the tracks that have `field`."""
+        np = _get_numpy()
+        if np is not None:
+            return np.array([v is not None for v in self.columns[field]], dtype=bool)
+        return [v is not None for v in self.columns[field]]
+
+    def get_track_paths(self) -> list[str]:
+        return [str(path) for path in self.columns[self.file.TRACK_PATH_KEY]]
+
+    def take(self, rows: Sequence[int]) -> "TrackTable":
+        """The table of only the tracks at `rows`, in that order."""
+        return TrackTable(
+            self.file,
+            [self.positions[row] for row in rows],
+            {field: [column[row] for row in rows] for field, column in self.columns.items()},
+        )
+
+    def filter(self, mask: Sequence[bool]) -> "TrackTable":
+        """
+        The table of only the tracks where `mask` is true, i.e. `table.filter(table.array(Fields.BPM, float) >= 120)`.
+        """
+        np = _get_numpy()
+        if np is not None:
+            return self.take(np.flatnonzero(np.asarray(mask, dtype=bool)).tolist())
+        return self.take([row for row, keep in enumerate(mask) if keep])
+
+    def where(self, field: str, func: Callable[[Any], bool]) -> "TrackTable":
+        """The table of only the tracks where `func(value)` is true. Missing values are skipped."""
+        return self.take([row for row, value in enumerate(self.columns[field]) if value is not None and func(value)])
+
+    def sort(self, field: str, reverse: bool = False, dtype: Any = None) -> "TrackTable":
+        """
+        Stable sort by `field`. Tracks without it are last. With a numeric `dtype` and NumPy installed, sorts the
+        converted `array(field, dtype)`.
+        """
+        np = _get_numpy()
+        if dtype is not None and np is not None and np.issubdtype(np.dtype(dtype), np.number):
+            values = self.array(field, dtype)
+            missing = np.isnan(values) if np.issubdtype(values.dtype, np.floating) else np.zeros(len(values), bool)
+            order = np.lexsort((-values if reverse else values, missing))
+            return self.take([int(row) for row in order])
+
+        column = self.columns[field]
+        present = [row for row in range(len(self)) if column[row] is not None]
+        present.sort(key=lambda row: column[row], reverse=reverse)  # type: ignore[arg-type,return-value]
+        return self.take(present + [row for row in range(len(self)) if column[row] is None])
+
+    def group_by(self, field: str) -> "dict[SeratoBinFile.Value | None, TrackTable]":
+        """A table per distinct value of `field`, in order of first appearance."""
+        groups: dict[SeratoBinFile.Value | None, list[int]] = {}
+        for row, value in enumerate(self.columns[field]):
+            groups.setdefault(value, []).append(row)
+        return {value: self.take(rows) for value, rows in groups.items()}
+
+    def set_values(self, field: str, values: "Sequence[SeratoBinFile.Value | None]"):
+        """
+        Sets `field` of each track in the table to its value in `values`, in the file's entries. `None` leaves the
+        track unchanged.
+        """
+        if len(values) != len(self):
+            raise ValueError(f"got {len(values)} values for {len(self)} tracks")
+        column = self.columns.setdefault(field, [None] * len(self))
+        changes: dict[int, SeratoBinFile.Value] = {}
+        for row, value in enumerate(values):
+            if value is None:
+                continue
+            value = value.item() if hasattr(value, "item") else value  # NumPy scalar
+            if type(column[row]) is not type(value) or column[row] != value:
+                changes[self.positions[row]] = value
+                column[row] = value
+        self.file._set_track_values(field, changes)  # pylint: disable=protected-access
@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+
+from src.serato_tools.database_v2 import DatabaseV2
+from src.serato_tools.utils.bin_file_diff import BinFileDiff
+
+# pylint: disable=protected-access
+
+Fields = DatabaseV2.Fields
+
+
+class TestCase(unittest.TestCase):
+    def test_diff_and_patch(self):
+        file = os.path.abspath("test/data/database_v2_test.bin")
+        db = DatabaseV2(file)
+        track_paths = db.get_track_paths()
+
+        def modify(track: DatabaseV2.Track) -> DatabaseV2.Track:
+            if track.relpath == track_paths[1]:
+                track.set_value(Fields.GENRE, "NEW_GENRE")
+                track.set_value(Fields.COMPOSER, "NEW_COMPOSER")
+            elif track.relpath == track_paths[2]:
+                return DatabaseV2.Track(
+                    [(f, v) for f, v in track.to_entries() if f != Fields.GROUPING], path_key=DatabaseV2.TRACK_PATH_KEY
+                )
+            return track
+
+        new_db = DatabaseV2(file)
+        new_db.filter_tracks(lambda track: track.relpath != track_paths[0])
+        new_db.modify_tracks(modify)
+        new_db._append_track([(Fields.FILE_TYPE, "mp3"), (Fields.FILE_PATH, "Music/new.mp3")])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            new_file = os.path.join(tmp_dir, DatabaseV2.FILENAME)
+            new_db.save(new_file)
+
+            self.assertFalse(DatabaseV2.diff(file, file), "no changes")
+
+            diff = DatabaseV2.diff(file, new_file)
+            self.assertEqual(diff.removed, [track_paths[0]])
+            self.assertEqual(diff.added, {"Music/new.mp3": [(Fields.FILE_TYPE, "mp3"), (Fields.FILE_PATH, "Music/new.mp3")]})
+            old_grouping = next(t for t in db._iter_tracks() if t.relpath == track_paths[2]).get_value(Fields.GROUPING)
+            self.assertEqual(
+                diff.changed,
+                {
+                    track_paths[1]: {
+                        Fields.GENRE: (
+                            next(t for t in db._iter_tracks() if t.relpath == track_paths[1]).get_value(Fields.GENRE),
+                            "NEW_GENRE",
+                        ),
+                        Fields.COMPOSER: (None, "NEW_COMPOSER"),
+                    },
+                    track_paths[2]: {Fields.GROUPING: (old_grouping, None)},
+                },
+            )
+
+            patch_file = os.path.join(tmp_dir, "patch.json")
+            diff.write_patch(patch_file)
+            BinFileDiff.read_patch(patch_file).apply(db)
+            self.assertEqual(db.entries, new_db.entries)
+            self.assertEqual(db.raw_data, new_db.raw_data)
+
+            with self.assertLogs("serato-tools", "WARNING"):
+                diff.apply(db)
+            self.assertEqual(db.entries, new_db.entries, "already applied, nothing changed")
@@ -1,6 +1,7 @@
 # pylint: disable=protected-access
 import unittest
 import os
+import tempfile
 
 from src.serato_tools.crate import Crate
 
@@ -58,3 +59,25 @@ class TestCase(unittest.TestCase):
         crate.add_track("C:/Users/bvand/Music/DJ Tracks/Thundercat - Them Changes.mp3")
         expected += "\notrk (Track): [ ptrk (Track Path): Users/bvand/Music/DJ Tracks/Thundercat - Them Changes.mp3 ]"
         self.assertEqual(crate.__str__(), expected, "track added")
+
+    def test_track_index(self):
+        crate = Crate(os.path.abspath("test/data/TestCrate.crate"))
+        track_paths = crate.get_track_paths()
+
+        self.assertTrue(crate.has_track(track_paths[0]))
+        self.assertFalse(crate.has_track(track_paths[0].upper()))
+        self.assertTrue(crate.has_track(track_paths[0].upper(), case_sensitive=False))
+
+        crate.remove_track(track_paths[0])
+        self.assertFalse(crate.has_track(track_paths[0]))
+        self.assertEqual(crate.get_track_paths(), track_paths[1:])
+
+        crate.add_track(track_paths[0])
+        crate.add_track(track_paths[0])
+        self.assertEqual(crate.get_track_paths(), track_paths[1:] + track_paths[:1])
+        self.assertTrue(crate.has_track(track_paths[0]))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            saved_file = os.path.join(tmp_dir, "TestCrate.crate")
+            crate.save(saved_file)
+            self.assertEqual(Crate(saved_file).get_track_paths(), crate.get_track_paths(), "added track was saved")
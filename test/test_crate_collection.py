@@ -0,0 +1,55 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from src.serato_tools.crate import Crate
+from src.serato_tools.smart_crate import SmartCrate
+from src.serato_tools.crate_collection import CrateCollection
+
+
+class TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for crate_cls, src, names in [
+            (Crate, "test/data/TestCrate.crate", ["A.crate", "B.crate"]),
+            (SmartCrate, "test/data/TestSmartCrate.scrate", ["C.scrate"]),
+        ]:
+            os.makedirs(os.path.join(self.tmp_dir, crate_cls.DIR))
+            for name in names:
+                shutil.copy(src, os.path.join(self.tmp_dir, crate_cls.DIR, name))
+        open(os.path.join(self.tmp_dir, Crate.DIR, "not_a_crate.txt"), "w", encoding="utf-8").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load(self):
+        crates = CrateCollection(serato_dir=self.tmp_dir)
+        self.assertEqual(
+            sorted(os.path.basename(f) for f in crates.crates), ["A.crate", "B.crate", "C.scrate"], "all crates loaded"
+        )
+        for file, crate in crates.crates.items():
+            expected_cls = SmartCrate if file.endswith(SmartCrate.EXTENSION) else Crate
+            self.assertEqual(type(crate).__name__, expected_cls.__name__)
+            self.assertEqual(crate.entries, CrateCollection.load_crate(file).entries)
+
+    def test_find_missing(self):
+        crates = CrateCollection(serato_dir=self.tmp_dir)
+        missing = crates.find_missing()
+        self.assertEqual(missing, {file: crate.get_track_paths(include_drive=True) for file, crate in crates.crates.items()})
+
+    def test_rewrite_track_paths(self):
+        crates = CrateCollection(serato_dir=self.tmp_dir)
+        crate_a = crates.crates[os.path.join(self.tmp_dir, Crate.DIR, "A.crate")]
+        track_path = crate_a.get_track_paths()[0]
+        new_track_path = track_path + ".renamed"
+
+        crates.rewrite_track_paths(lambda path: path)
+        self.assertEqual(crates.save(), [], "nothing changed, nothing saved")
+
+        crates.rewrite_track_paths(lambda path: new_track_path if path == track_path else path)
+        saved = crates.save()
+        self.assertEqual(saved, [crate.filepath for crate in crates if crate.has_track(new_track_path)])
+        self.assertIn(crate_a.filepath, saved)
+        self.assertEqual(Crate(crate_a.filepath).get_track_paths(), crate_a.get_track_paths())
+        self.assertEqual(crates.get_modified(), [])
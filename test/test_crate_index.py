@@ -0,0 +1,64 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from src.serato_tools.crate import Crate
+from src.serato_tools.smart_crate import SmartCrate
+from src.serato_tools import crate_index
+from src.serato_tools.crate_index import CrateIndex
+
+
+class TestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for crate_cls, src, names in [
+            (Crate, "test/data/TestCrate.crate", ["A.crate", "B.crate"]),
+            (SmartCrate, "test/data/TestSmartCrate.scrate", ["C.scrate"]),
+        ]:
+            os.makedirs(os.path.join(self.tmp_dir, crate_cls.DIR))
+            for name in names:
+                shutil.copy(src, os.path.join(self.tmp_dir, crate_cls.DIR, name))
+        self.crate_a = os.path.join(self.tmp_dir, Crate.DIR, "A.crate")
+        self.crate_b = os.path.join(self.tmp_dir, Crate.DIR, "B.crate")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_crate_files(self):
+        index = CrateIndex(serato_dir=self.tmp_dir)
+        track_path = Crate(self.crate_a).get_track_paths()[0]
+        self.assertEqual(index.get_crate_files(track_path), [self.crate_a, self.crate_b])
+        self.assertEqual(index.get_crate_files(track_path.upper()), [self.crate_a, self.crate_b], "not case-sensitive")
+        self.assertEqual(index.get_crate_files("not/in/a/crate.mp3"), [])
+        self.assertTrue(os.path.isfile(index.cache_file or ""))
+
+    def test_cache(self):
+        CrateIndex(serato_dir=self.tmp_dir)
+        track_path = Crate(self.crate_a).get_track_paths()[0]
+
+        load_crate = crate_index.CrateCollection.load_crate
+        with mock.patch.object(crate_index.CrateCollection, "load_crate", wraps=load_crate) as load_crate_mock:
+            index = CrateIndex(serato_dir=self.tmp_dir)
+            load_crate_mock.assert_not_called()
+            self.assertEqual(index.get_crate_files(track_path), [self.crate_a, self.crate_b])
+
+            crate = Crate(self.crate_a)
+            crate.remove_track(track_path)
+            crate.save()
+            os.remove(self.crate_b)
+
+            index = CrateIndex(serato_dir=self.tmp_dir)
+            self.assertEqual([call.args[0] for call in load_crate_mock.call_args_list], [self.crate_a])
+            self.assertEqual(index.get_crate_files(track_path), [])
+
+    def test_update(self):
+        index = CrateIndex(serato_dir=self.tmp_dir, cache=False)
+        track_path = Crate(self.crate_a).get_track_paths()[0]
+
+        crate = Crate(self.crate_a)
+        crate.remove_track(track_path)
+        crate.save()
+        index.update(crate)
+        self.assertEqual(index.get_crate_files(track_path), [self.crate_b])
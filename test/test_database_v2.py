@@ -2,8 +2,12 @@
 import unittest
 import os
 import json
+import shutil
+import tempfile
+from unittest import mock
 
 from src.serato_tools.database_v2 import DatabaseV2
+from src.serato_tools.crate import Crate
 
 
 class TestCase(unittest.TestCase):
@@ -25,6 +29,11 @@ class TestCase(unittest.TestCase):
             "Music/DJ Tracks/Tripp St. - Enlighten.mp3",
         )
 
+    def test_get_field_name(self):
+        self.assertEqual(DatabaseV2.get_field_name(DatabaseV2.Fields.DATE_ADDED_U), "Date Added")
+        self.assertEqual(DatabaseV2.get_field_name("rlut"), "SmartCrate Live Update")
+        self.assertEqual(DatabaseV2.get_field_name("xxxx"), "Unknown Field")
+
     def test_parse_and_dump(self):
         file = os.path.abspath("test/data/database_v2_test.bin")
         with open(file, mode="rb") as fp:
@@ -42,6 +51,146 @@ class TestCase(unittest.TestCase):
         db._dump()
         self.assertEqual(db.raw_data, file_data, "raw_data read")
 
+    def test_parse_buffer_in_place(self):
+        with open(os.path.abspath("test/data/database_v2_test.bin"), mode="rb") as fp:
+            file_data = fp.read()
+
+        db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
+
+        padded = memoryview(b"\x00" * 4 + file_data + b"\x00" * 4)
+        self.assertEqual(DatabaseV2._parse_buffer(padded, 4, 4 + len(file_data)), db.entries)
+
+        with self.assertRaises(ValueError):
+            DatabaseV2._parse_buffer(memoryview(file_data), 0, len(file_data) - 1)
+
+    def test_lazy_load(self):
+        file = os.path.abspath("test/data/database_v2_test.bin")
+        db = DatabaseV2(file)
+        lazy_db = DatabaseV2(file, lazy=True)
+
+        self.assertEqual(lazy_db.get_track_paths(), db.get_track_paths())
+        self.assertTrue(lazy_db._is_lazy(), "track paths read without decoding entries")
+
+        track_path = db.get_track_paths()[0]
+        lazy_db.filter_tracks(lambda track: track.relpath != track_path)
+        db.filter_tracks(lambda track: track.relpath != track_path)
+        self.assertFalse(lazy_db._is_lazy())
+        self.assertEqual(lazy_db.entries, db.entries)
+        self.assertEqual(lazy_db.raw_data, db.raw_data)
+
+        lazy_db = DatabaseV2(file, lazy=True)
+        self.assertEqual(lazy_db.entries, DatabaseV2(file).entries)
+
+    def test_parse_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file = os.path.join(tmp_dir, DatabaseV2.FILENAME)
+            cache_dir = os.path.join(tmp_dir, "cache")
+            with open(os.path.abspath("test/data/database_v2_test.bin"), "rb") as f:
+                file_data = f.read()
+            with open(file, "wb") as f:
+                f.write(file_data)
+
+            db = DatabaseV2(file, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            with mock.patch.object(DatabaseV2.__bases__[0], "_parse_item", side_effect=AssertionError("parsed")):
+                cached_db = DatabaseV2(file, cache_dir=cache_dir)
+            self.assertEqual(cached_db.entries, db.entries)
+            cached_db._dump()
+            self.assertEqual(cached_db.raw_data, file_data)
+
+            # same size and modification time, different content
+            stat = os.stat(file)
+            with open(file, "wb") as f:
+                f.write(file_data.replace("Zeds Dead".encode("utf-16-be"), "Zeds Live".encode("utf-16-be")))
+            os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            with mock.patch.object(DatabaseV2.__bases__[0], "_parse_item", wraps=DatabaseV2._parse_item) as parse_mock:
+                changed_db = DatabaseV2(file, cache_dir=cache_dir)
+            parse_mock.assert_called_once()
+            self.assertNotEqual(changed_db.entries, db.entries)
+
+    def test_track(self):
+        db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
+        entries = next(value for field, value in db.entries if field == DatabaseV2.Fields.TRACK)
+        original_entries = list(entries)
+        assert isinstance(entries, list)
+
+        track = DatabaseV2.Track(entries, path_key=DatabaseV2.TRACK_PATH_KEY)
+        self.assertEqual(track.fields, [field for field, _ in entries])
+        self.assertEqual(track.tkey, track.get_value(DatabaseV2.Fields.KEY))
+        self.assertIs(track.to_entries(), entries, "unmodified track is not copied")
+        with self.assertRaises(AttributeError):
+            track.get_value("xxxx")
+
+        track.set_value(DatabaseV2.Fields.KEY, "1A")
+        track.set_value("xxxx", "new field")
+        track.set_path("Music/renamed.mp3")
+        self.assertEqual(entries, original_entries, "the parsed entries are not changed in place")
+        self.assertEqual(track.relpath, "Music/renamed.mp3")
+        self.assertEqual(
+            track.to_entries(),
+            [
+                (field, {DatabaseV2.Fields.KEY: "1A", DatabaseV2.TRACK_PATH_KEY: "Music/renamed.mp3"}.get(field, value))
+                for field, value in entries
+            ]
+            + [("xxxx", "new field")],
+        )
+
+    def test_streaming(self):
+        file = os.path.abspath("test/data/database_v2_test.bin")
+        db = DatabaseV2(file)
+        self.assertEqual([track.relpath for track in DatabaseV2.iter_tracks(file)], db.get_track_paths())
+
+        track_paths = db.get_track_paths()
+
+        def modify(track: DatabaseV2.Track) -> DatabaseV2.Track:
+            if track.relpath == track_paths[1]:
+                track.set_value(DatabaseV2.Fields.KEY, "1A")
+            return track
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dest = os.path.join(tmp_dir, DatabaseV2.FILENAME)
+            n_tracks = DatabaseV2.transform(file, dest, lambda track: track.relpath != track_paths[0], modify)
+            self.assertEqual(n_tracks, len(track_paths) - 1)
+
+            with db.batch():
+                db.filter_tracks(lambda track: track.relpath != track_paths[0])
+                db.modify_tracks(modify)
+            with open(dest, "rb") as f:
+                self.assertEqual(f.read(), db.raw_data)
+
+            self.assertEqual(DatabaseV2.transform(dest), n_tracks)
+            with open(dest, "rb") as f:
+                self.assertEqual(f.read(), db.raw_data, "unchanged tracks are copied as is")
+            self.assertEqual(os.listdir(tmp_dir), [DatabaseV2.FILENAME])
+
+    def test_write_json(self):
+        file = os.path.abspath("test/data/database_v2_test.bin")
+        db = DatabaseV2(file)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_file = os.path.join(tmp_dir, "db.json")
+            DatabaseV2(file, lazy=True).write_json(json_file)
+            with open(json_file, "r", encoding="utf-8") as f, open(
+                "test/data/database_v2_json.json", "r", encoding="utf-8"
+            ) as expected:
+                self.assertEqual(f.read(), expected.read())
+            self.assertEqual(list(DatabaseV2.iter_json_entries(json_file)), db.entries)
+            with mock.patch.object(DatabaseV2.__bases__[0], "JSON_READ_SIZE", 7):
+                self.assertEqual(list(DatabaseV2.iter_json_entries(json_file)), db.entries, "read in small chunks")
+
+            jsonl_file = os.path.join(tmp_dir, "db.jsonl")
+            db.write_json(jsonl_file)
+            with open(jsonl_file, "r", encoding="utf-8") as f:
+                json_lines = f.read().splitlines()
+            self.assertEqual([json.loads(line) for line in json_lines], db.to_json_object(), "one entry per line")
+            self.assertEqual(DatabaseV2(jsonl_file).raw_data, db.raw_data)
+
+            json_lines[1] = json_lines[1].replace('"type": "list"', '"type": "int"')
+            with open(jsonl_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(json_lines))
+            with self.assertRaisesRegex(ValueError, "invalid entry 1"):
+                list(DatabaseV2.iter_json_entries(jsonl_file))
+
     def test_parse_and_modify(self):
         db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
 
@@ -53,7 +202,7 @@ class TestCase(unittest.TestCase):
 
         original_entries = db.entries
         original_raw_data = db.raw_data
-        db.modify([])
+        self.assertEqual(db.modify([]), [])
         self.assertEqual(db.entries, original_entries, "was not modified")
         self.assertEqual(db.raw_data, original_raw_data, "was not modified")
         self.assertEqual(db.__str__(), expected, "was not modified")
@@ -71,23 +220,239 @@ class TestCase(unittest.TestCase):
         with open("test/data/database_v2_test_modified_output.bin", "rb") as f:
             self.assertEqual(db.raw_data, f.read(), "was modified correctly")
 
-        db.modify(
-            [
-                {
-                    "field": DatabaseV2.Fields.GENRE,
-                    "func": lambda *args: "NEW_GENRE",
-                    "files": [
-                        "Users\\bvand\\Music\\DJ Tracks\\Zeds Dead - In The Beginning.mp3",
-                        "C:/Users/bvand/Music/DJ Tracks/Tripp St. - Enlighten.mp3",
-                    ],
-                },
-            ]
+        files = [
+            "Users\\bvand\\Music\\DJ Tracks\\Zeds Dead - In The Beginning.mp3",
+            "C:/Users/bvand/Music/DJ Tracks/Tripp St. - Enlighten.mp3",
+        ]
+        rules: list[DatabaseV2.ModifyRule] = [
+            {"field": DatabaseV2.Fields.GENRE, "func": lambda *args: "NEW_GENRE", "files": files}
+        ]
+        changes = db.modify(rules)
+        self.assertEqual(rules[0]["files"], files, "rules are not changed")
+        self.assertEqual(
+            [(change["track"], change["field"], change["new_value"]) for change in changes],
+            [(DatabaseV2.get_relative_path(file), DatabaseV2.Fields.GENRE, "NEW_GENRE") for file in files],
         )
+        self.assertEqual(db.modify(rules), [], "already set")
         with open("test/data/database_v2_test_modified_output_2.txt", "r", encoding="utf-8") as f:
             self.assertEqual(db.__str__(), f.read(), "was modified correctly, given files")
         with open("test/data/database_v2_test_modified_output_2.bin", "rb") as f:
             self.assertEqual(db.raw_data, f.read(), "was modified correctly, given files")
 
+    def test_change_track_path(self):
+        db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
+        track_paths = db.get_track_paths()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dest = os.path.join(tmp_dir, "renamed.mp3")
+            open(dest, "wb").close()
+
+            db.change_track_path(track_paths[1].upper(), dest)
+
+        self.assertEqual(db.get_track_paths(), [track_paths[0], DatabaseV2.get_relative_path(dest), *track_paths[2:]])
+        self.assertFalse(db.has_track(track_paths[1]))
+        self.assertTrue(db.has_track(dest))
+
+    def test_rename_track_files(self):
+        db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            track_files = [os.path.join(tmp_dir, f"track {i}.mp3") for i in range(len(db.get_track_paths()))]
+            for track_file in track_files:
+                open(track_file, "wb").close()
+
+            db_file = os.path.join(tmp_dir, DatabaseV2.FILENAME)
+            track_iter = iter(track_files)
+            db.modify_tracks(lambda track: track.set_path(next(track_iter)) or track)
+            db.save(db_file)
+
+            os.makedirs(os.path.join(tmp_dir, Crate.DIR))
+            crate = Crate(os.path.join(tmp_dir, Crate.DIR, "Test.crate"))
+            crate.add_track(track_files[1])
+            crate.save()
+
+            renamed_files = [track_file.replace("track", "renamed") for track_file in track_files]
+            results = DatabaseV2(db_file).rename_track_files(
+                {track_files[1]: renamed_files[1], track_files[2] + ".missing": renamed_files[2]}
+            )
+
+            self.assertIsNone(results[track_files[1]]["error"])
+            self.assertIsNotNone(results[track_files[2] + ".missing"]["error"])
+            self.assertTrue(os.path.exists(renamed_files[1]))
+            self.assertEqual(
+                DatabaseV2(db_file).get_track_paths(),
+                [DatabaseV2.get_relative_path(f) for f in [track_files[0], renamed_files[1], *track_files[2:]]],
+            )
+            self.assertEqual(Crate(crate.filepath).get_track_paths(), [Crate.get_relative_path(renamed_files[1])])
+
+    def test_scan_missing(self):
+        db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "library"))
+            os.makedirs(os.path.join(tmp_dir, "moved", "sub"))
+            track_files = [os.path.join(tmp_dir, "library", f"track {i}.mp3") for i in range(len(db.get_track_paths()))]
+            for track_file in track_files:
+                open(track_file, "wb").close()
+            track_iter = iter(track_files)
+            db.modify_tracks(lambda track: track.set_path(next(track_iter)) or track)
+
+            os.rename(track_files[0], os.path.join(tmp_dir, "moved", "sub", "track 0.mp3"))
+            os.remove(track_files[1])
+
+            report = db.scan_missing(search_roots=[os.path.join(tmp_dir, "moved")])
+            self.assertEqual(report["checked"], len(track_files))
+            self.assertEqual(
+                report["missing"],
+                {
+                    DatabaseV2.get_relative_path(track_files[0]): [os.path.join(tmp_dir, "moved", "sub", "track 0.mp3")],
+                    DatabaseV2.get_relative_path(track_files[1]): [],
+                },
+            )
+
+    def test_relink_missing(self):
+        db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library, moved = os.path.join(tmp_dir, "library"), os.path.join(tmp_dir, "moved")
+            for d in [library, os.path.join(moved, "a"), os.path.join(moved, "b"), os.path.join(tmp_dir, Crate.DIR)]:
+                os.makedirs(d)
+            track_files = [os.path.join(library, f"track {i}.mp3") for i in range(len(db.get_track_paths()))]
+            for track_file in [*track_files, os.path.join(library, "crate only.mp3")]:
+                with open(track_file, "wb") as f:
+                    f.write(os.path.basename(track_file).encode())
+            track_iter = iter(track_files)
+            db.modify_tracks(lambda track: track.set_path(next(track_iter)) or track)
+            db_file = os.path.join(tmp_dir, DatabaseV2.FILENAME)
+            db.save(db_file)
+            crate = Crate(os.path.join(tmp_dir, Crate.DIR, "Test.crate"))
+            crate.add_track(track_files[0])
+            crate.add_track(os.path.join(library, "crate only.mp3"))
+            crate.save()
+
+            os.rename(track_files[0], os.path.join(moved, "a", "track 0.mp3"))
+            os.rename(os.path.join(library, "crate only.mp3"), os.path.join(moved, "crate only.mp3"))
+            shutil.copy(track_files[1], os.path.join(moved, "a", "track 1.mp3"))
+            os.rename(track_files[1], os.path.join(moved, "b", "track 1.mp3"))
+            os.remove(track_files[2])
+
+            report = DatabaseV2(db_file).relink_missing([moved])
+            relpaths = [DatabaseV2.get_relative_path(f) for f in [*track_files, os.path.join(library, "crate only.mp3")]]
+            self.assertEqual(
+                report["relinked"],
+                {relpaths[0]: os.path.join(moved, "a", "track 0.mp3"), relpaths[-1]: os.path.join(moved, "crate only.mp3")},
+            )
+            self.assertEqual(sorted(report["ambiguous"][relpaths[1]]), [os.path.join(moved, d, "track 1.mp3") for d in "ab"])
+            self.assertEqual(report["not_found"], [relpaths[2]])
+            self.assertEqual(
+                DatabaseV2(db_file).get_track_paths(),
+                [DatabaseV2.get_relative_path(os.path.join(moved, "a", "track 0.mp3")), *relpaths[1:-1]],
+            )
+            self.assertEqual(
+                Crate(crate.filepath).get_track_paths(),
+                [Crate.get_relative_path(path) for path in report["relinked"].values()],
+            )
+
+            relinked = DatabaseV2(db_file).relink_missing([moved], hash_files=True)["relinked"]
+            self.assertEqual(list(relinked), [relpaths[1]], "copies of the same file are one match")
+            self.assertIn(relinked[relpaths[1]], report["ambiguous"][relpaths[1]])
+
+    def test_merge(self):
+        Fields = DatabaseV2.Fields
+        file = os.path.abspath("test/data/database_v2_test.bin")
+
+        def set_path(path: str):
+            def modify(track: DatabaseV2.Track) -> DatabaseV2.Track:
+                track.set_path(path.format(os.path.splitext(os.path.basename(track.relpath))[0]))
+                return track
+
+            return modify
+
+        drive_db = DatabaseV2(file)
+        drive_db.modify_tracks(set_path("Tracks/{}.mp3"))
+        drive_db.modify_tracks(lambda track: track.set_value(Fields.PLAYED, True) or track)
+        drive_paths = drive_db.get_track_paths()
+
+        moved_path = "Other/" + os.path.basename(drive_paths[1])
+        export_db = DatabaseV2(file)
+        export_db.modify_tracks(set_path("Tracks/{}.mp3"))
+        export_db.filter_tracks(lambda track: track.relpath != drive_paths[3])
+        export_db.modify_tracks(lambda track: track.set_value(Fields.GENRE, "NEW_GENRE") or track)
+        export_db.modify_tracks(lambda track: track.set_path(moved_path) or track if track.relpath == drive_paths[1] else track)
+        export_db._append_track([(Fields.FILE_TYPE, "mp3"), (Fields.FILE_PATH, "Tracks/new.mp3")])
+
+        report = drive_db.merge(export_db)
+        self.assertEqual(report, {"updated": 3, "added": 1, "removed": 1})
+        self.assertEqual(drive_db.get_track_paths(), [drive_paths[0], moved_path, drive_paths[2], "Tracks/new.mp3"])
+        tracks = list(drive_db._iter_tracks())
+        self.assertEqual([track.get_value(Fields.GENRE) for track in tracks[:3]], ["NEW_GENRE"] * 3)
+        self.assertEqual([track.get_value(Fields.PLAYED) for track in tracks[:3]], [True] * 3, "kept")
+        self.assertEqual(tracks[3].to_entries(), [(Fields.FILE_TYPE, "mp3"), (Fields.FILE_PATH, "Tracks/new.mp3")])
+        self.assertEqual(drive_db.raw_data, DatabaseV2._dump_entries(drive_db.entries))
+
+        self.assertEqual(drive_db.merge(export_db), {"updated": 0, "added": 0, "removed": 0})
+
+    def test_dump_only_modified(self):
+        db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
+        track_path = db.get_track_paths()[1]
+
+        dump_item = DatabaseV2._dump_item
+        with mock.patch.object(DatabaseV2.__bases__[0], "_dump_item", side_effect=dump_item) as dump_item_mock:
+            db.modify([{"field": DatabaseV2.Fields.GENRE, "func": lambda *args: "NEW_GENRE", "files": [track_path]}])
+
+        dumped_fields = [call.args[0][0] for call in dump_item_mock.call_args_list]
+        self.assertEqual(dumped_fields.count(DatabaseV2.Fields.TRACK), 1, "only the modified track was encoded")
+        self.assertEqual(db.raw_data, DatabaseV2._dump_entries(db.entries))
+
+    def test_batch(self):
+        file = os.path.abspath("test/data/database_v2_test.bin")
+        track_paths = DatabaseV2(file).get_track_paths()
+
+        def set_genre(track: DatabaseV2.Track):
+            track.set_value(DatabaseV2.Fields.GENRE, "NEW_GENRE")
+            return track
+
+        db = DatabaseV2(file)
+        db.remove_track(track_paths[0])
+        db.modify_tracks(set_genre)
+        db.filter_tracks(lambda track: track.relpath != track_paths[2])
+
+        for lazy in (False, True):
+            batch_db = DatabaseV2(file, lazy=lazy)
+            with mock.patch.object(batch_db, "_dump_with_spans", wraps=batch_db._dump_with_spans) as dump_mock:
+                with batch_db.batch():
+                    batch_db.remove_track(track_paths[0])
+                    batch_db.modify_tracks(set_genre)
+                    batch_db.filter_tracks(lambda track: track.relpath != track_paths[2])
+                    self.assertFalse(batch_db.has_track(track_paths[2]))
+                    self.assertTrue(batch_db.has_track(track_paths[1]))
+                    dump_mock.assert_not_called()
+            dump_mock.assert_called_once()
+            self.assertEqual(batch_db.entries, db.entries)
+            self.assertEqual(batch_db.raw_data, db.raw_data)
+
+    def test_save(self):
+        file = os.path.abspath("test/data/database_v2_test.bin")
+        track_path = DatabaseV2(file).get_track_paths()[0]
+        db = DatabaseV2(file)
+        db.remove_track(track_path)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for lazy in (False, True):
+                saved_file = os.path.join(tmp_dir, "database V2")
+                DatabaseV2(file, lazy=lazy).save(saved_file)
+
+                saved_db = DatabaseV2(saved_file, lazy=lazy)
+                with saved_db.batch(save=True):
+                    saved_db.remove_track(track_path)
+
+                self.assertEqual(os.listdir(tmp_dir), ["database V2"], "temporary file was renamed over the original")
+                with open(saved_file, "rb") as f:
+                    self.assertEqual(f.read(), db.raw_data)
+                self.assertEqual(bytes(saved_db.raw_data), db.raw_data)
+
+                saved_db.remove_track(db.get_track_paths()[0])
+                saved_db.save()
+                self.assertEqual(DatabaseV2(saved_file).entries, saved_db.entries)
+                del saved_db
+
     def test_dedupe(self):
         db = DatabaseV2(os.path.abspath("test/data/database_v2_duplicates.bin"))
 
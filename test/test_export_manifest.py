@@ -0,0 +1,46 @@
+import unittest
+import os
+import tempfile
+
+from src.serato_tools.utils.export_manifest import ExportManifest
+
+
+class TestCase(unittest.TestCase):
+    def test_manifest(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            drive_dir = os.path.join(tmp_dir, "drive")
+            serato_dir = os.path.join(drive_dir, "_Serato_")
+            src_file = os.path.join(tmp_dir, "track.mp3")
+            with open(src_file, "wb") as f:
+                f.write(b"audio")
+            dest_file = os.path.join(drive_dir, "Tracks", "track.mp3")
+            crate_file = os.path.join(serato_dir, "Subcrates", "crate.crate")
+
+            manifest = ExportManifest(drive_dir, serato_dir)
+            self.assertFalse(manifest.is_unchanged(src_file, dest_file, os.stat(src_file)))
+            manifest.add_file(src_file, dest_file, os.stat(src_file), hash_files=True)
+            self.assertTrue(manifest.write_data_file(crate_file, b"crate"))
+            self.assertFalse(manifest.write_data_file(crate_file, b"crate"), "unchanged")
+            manifest.save()
+
+            manifest = ExportManifest(drive_dir, serato_dir)
+            self.assertEqual(list(manifest.files), ["Tracks/track.mp3"])
+            self.assertTrue(manifest.is_unchanged(src_file, dest_file, os.stat(src_file)))
+            self.assertFalse(manifest.is_unchanged(src_file + ".x", dest_file, os.stat(src_file)), "other source")
+            self.assertFalse(manifest.write_data_file(crate_file, b"crate"))
+            self.assertTrue(manifest.write_data_file(crate_file, b"changed"))
+            with open(crate_file, "rb") as f:
+                self.assertEqual(f.read(), b"changed")
+
+            os.utime(src_file, (1000, 1000))
+            self.assertFalse(manifest.is_unchanged(src_file, dest_file, os.stat(src_file)))
+            self.assertTrue(manifest.is_unchanged(src_file, dest_file, os.stat(src_file), hash_files=True), "same content")
+            with open(src_file, "wb") as f:
+                f.write(b"AUDIO")
+            os.utime(src_file, (2000, 2000))
+            self.assertFalse(manifest.is_unchanged(src_file, dest_file, os.stat(src_file), hash_files=True))
+
+            self.assertEqual(manifest.get_stale({dest_file}), [crate_file])
+            manifest.remove(crate_file)
+            self.assertEqual(manifest.get_stale({dest_file}), [])
+            self.assertEqual(manifest.get_stale(set()), [dest_file])
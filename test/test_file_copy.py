@@ -0,0 +1,93 @@
+import unittest
+import os
+import errno
+import tempfile
+from unittest import mock
+
+from src.serato_tools.utils.file_copy import FileCopier
+
+
+class TestCase(unittest.TestCase):
+    def test_copy_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_files = [os.path.join(tmp_dir, f"src {i}.mp3") for i in range(5)]
+            for i, src_file in enumerate(src_files):
+                with open(src_file, "wb") as f:
+                    f.write(os.urandom(1000 * i + 1))
+            os.utime(src_files[0], (1000, 1000))
+            dest_files = [os.path.join(tmp_dir, "dest", "Tracks", os.path.basename(f)) for f in src_files]
+            missing = os.path.join(tmp_dir, "missing.mp3")
+
+            copier = FileCopier(max_workers=2, buffer_size=1024)
+            result = copier.copy_files([*zip(src_files, dest_files), (missing, dest_files[0] + ".x")], show_progress=False)
+            self.assertEqual(sorted(result["copied"]), sorted(dest_files))
+            self.assertEqual(result["not_found"], [missing])
+            self.assertEqual(result["copied_bytes"], sum(os.path.getsize(f) for f in src_files))
+            for src_file, dest_file in zip(src_files, dest_files):
+                with open(src_file, "rb") as src, open(dest_file, "rb") as dest:
+                    self.assertEqual(src.read(), dest.read())
+            self.assertEqual(os.stat(dest_files[0]).st_mtime, 1000, "modification time is copied")
+            self.assertFalse(any(f.endswith(FileCopier.PART_SUFFIX) for f in os.listdir(os.path.dirname(dest_files[0]))))
+
+            with open(src_files[1], "ab") as f:
+                f.write(b"changed")
+            result = copier.copy_files(zip(src_files, dest_files), show_progress=False)
+            self.assertEqual(result["copied"], [dest_files[1]])
+            self.assertEqual(len(result["skipped"]), len(src_files) - 1)
+
+    def test_copy_file_fallback(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_file, dest_file = os.path.join(tmp_dir, "src"), os.path.join(tmp_dir, "dest")
+            data = os.urandom(10000)
+            with open(src_file, "wb") as f:
+                f.write(data)
+
+            not_supported = OSError(errno.EXDEV, "not supported")
+            with mock.patch("os.copy_file_range", side_effect=not_supported, create=True), mock.patch(
+                "os.sendfile", side_effect=OSError(errno.EINVAL, "not supported"), create=True
+            ):
+                progress: list[int] = []
+                FileCopier(buffer_size=4096).copy_file(src_file, dest_file, progress.append)
+            with open(dest_file, "rb") as f:
+                self.assertEqual(f.read(), data)
+            self.assertEqual(progress, [4096, 4096, 10000 - 2 * 4096])
+
+    def test_copy_files_to_targets(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_files = [os.path.join(tmp_dir, f"src {i}.mp3") for i in range(3)]
+            for i, src_file in enumerate(src_files):
+                with open(src_file, "wb") as f:
+                    f.write(os.urandom(5000 * i + 1))
+            missing = os.path.join(tmp_dir, "missing.mp3")
+
+            def get_targets(dirname: str) -> dict[str, list[tuple[str, str]]]:
+                return {
+                    drive: [(f, os.path.join(tmp_dir, dirname, drive, os.path.basename(f))) for f in [*src_files, missing]]
+                    for drive in ["A", "B"]
+                }
+
+            targets = get_targets("streamed")
+            os.makedirs(targets["B"][1][1])  # a directory in the way of a file, so B fails to write it
+            with mock.patch.object(FileCopier, "_copy_data") as copy_data_mock, self.assertLogs("serato-tools", "ERROR"):
+                results = FileCopier(buffer_size=4096).copy_files_to_targets(targets, show_progress=False)
+            copy_data_mock.assert_not_called()  # each source was only read by fanning out
+            self.assertEqual(results["A"]["copied"], [dest for _, dest in targets["A"][:3]])
+            self.assertEqual(results["B"]["copied"], [targets["B"][0][1], targets["B"][2][1]], "B carried on")
+            self.assertEqual(results["B"]["failed"], [targets["B"][1][1]])
+            self.assertEqual(results["A"]["not_found"], [missing])
+            self.assertEqual(results["A"]["copied_bytes"], sum(os.path.getsize(f) for f in src_files))
+
+            # falls behind right away, so copies each file itself
+            targets = get_targets("behind")
+            results = FileCopier(buffer_size=4096, max_buffer=0).copy_files_to_targets(targets, show_progress=False)
+            for drive in targets:
+                self.assertEqual(results[drive]["copied"], [dest for _, dest in targets[drive][:3]])
+
+            for dirname in ["streamed", "behind"]:
+                for drive, files in get_targets(dirname).items():
+                    for src_file, dest_file in files[:3]:
+                        if dest_file in results[drive]["failed"] or os.path.isdir(dest_file):
+                            continue
+                        with open(src_file, "rb") as src, open(dest_file, "rb") as dest:
+                            self.assertEqual(src.read(), dest.read())
+                    self.assertFalse(any(f.endswith(FileCopier.PART_SUFFIX) for f in os.listdir(os.path.dirname(files[0][1]))))
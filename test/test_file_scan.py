@@ -0,0 +1,58 @@
+import unittest
+import os
+import tempfile
+
+from src.serato_tools.utils.file_scan import BasenameIndex, DirListingCache, RelocationIndex
+
+
+class TestCase(unittest.TestCase):
+    def test_dir_listing_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "a", "sub"))
+            open(os.path.join(tmp_dir, "a", "track.mp3"), "wb").close()
+
+            paths = [
+                os.path.join(tmp_dir, "a", "track.mp3"),
+                os.path.join(tmp_dir, "a", "other.mp3"),
+                os.path.join(tmp_dir, "a", "sub"),
+                os.path.join(tmp_dir, "missing_dir", "track.mp3"),
+                os.path.join(tmp_dir, "a", "TRACK.mp3"),
+            ]
+            cache = DirListingCache()
+            self.assertEqual(cache.check(paths), {path: os.path.isfile(path) for path in paths})
+
+            os.remove(paths[0])
+            self.assertTrue(cache.isfile(paths[0]), "uses the cached listing")
+            self.assertFalse(DirListingCache().isfile(paths[0]))
+
+    def test_basename_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for path in ["top.mp3", "a/track.mp3", "a/b/Track.MP3", "c/other.mp3"]:
+                os.makedirs(os.path.dirname(os.path.join(tmp_dir, path)), exist_ok=True)
+                open(os.path.join(tmp_dir, path), "wb").close()
+
+            index = BasenameIndex([tmp_dir, os.path.join(tmp_dir, "missing_root")])
+            self.assertEqual(len(index), 4)
+            self.assertEqual(
+                sorted(index.find("Music/track.mp3")),
+                [os.path.join(tmp_dir, "a", "b", "Track.MP3"), os.path.join(tmp_dir, "a", "track.mp3")],
+            )
+            self.assertEqual(index.find("top.mp3"), [os.path.join(tmp_dir, "top.mp3")])
+            self.assertEqual(index.find("none.mp3"), [])
+
+    def test_relocation_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for path, data in [("a/track.mp3", b"x" * 100), ("b/track.mp3", b"x" * 200), ("c/track.mp3", b"x" * 200)]:
+                os.makedirs(os.path.dirname(os.path.join(tmp_dir, path)), exist_ok=True)
+                with open(os.path.join(tmp_dir, path), "wb") as f:
+                    f.write(data)
+
+            index = RelocationIndex([tmp_dir])
+            self.assertEqual(index.get_size(os.path.join(tmp_dir, "a", "track.mp3")), 100)
+            self.assertEqual(len(index.match("track.mp3")), 3)
+            self.assertEqual(index.match("track.mp3", size=104, size_tolerance=0.05), [os.path.join(tmp_dir, "a", "track.mp3")])
+            self.assertEqual(len(index.match("track.mp3", size=200)), 2)
+
+            index = RelocationIndex([tmp_dir], hash_files=True)
+            self.assertIn(index.match("track.mp3", size=200)[0], [os.path.join(tmp_dir, d, "track.mp3") for d in "bc"])
+            self.assertEqual(len(index.match("track.mp3", size=200)), 1, "same content, one match")
@@ -0,0 +1,72 @@
+import unittest
+import os
+from unittest import mock
+
+from src.serato_tools.database_v2 import DatabaseV2
+from src.serato_tools.utils import track_table
+
+try:
+    import numpy  # pylint: disable=unused-import
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+Fields = DatabaseV2.Fields
+FIELDS = [Fields.BPM, Fields.KEY, Fields.DATE_ADDED_U, Fields.GROUPING]
+
+
+class TestCase(unittest.TestCase):
+    def _test_queries(self, db: DatabaseV2):
+        table = db.get_track_table(FIELDS)
+        tracks = list(db._iter_tracks())  # pylint: disable=protected-access
+
+        self.assertEqual(len(table), len(tracks))
+        self.assertEqual(table.get_track_paths(), db.get_track_paths())
+        for field in FIELDS:
+            self.assertEqual(table.column(field), [getattr(track, field, None) for track in tracks])
+        self.assertEqual(list(table.valid(Fields.BPM)), [True] * len(tracks))
+
+        in_range = table.where(Fields.BPM, lambda bpm: 80 <= float(bpm) < 140)
+        self.assertEqual(in_range.get_track_paths(), [t.relpath for t in tracks if 80 <= float(t.tbpm) < 140])
+
+        by_bpm = table.sort(Fields.BPM, reverse=True, dtype=float)
+        self.assertEqual(by_bpm.get_track_paths(), [t.relpath for t in sorted(tracks, key=lambda t: -float(t.tbpm))])
+        self.assertEqual(table.sort(Fields.KEY).column(Fields.KEY), sorted(t.tkey for t in tracks))
+
+        groups = table.group_by(Fields.KEY)
+        self.assertEqual(
+            {key: group.get_track_paths() for key, group in groups.items()},
+            {key: [t.relpath for t in tracks if t.tkey == key] for key in dict.fromkeys(t.tkey for t in tracks)},
+        )
+
+        mask = [i % 2 == 0 for i in range(len(table))]
+        self.assertEqual(table.filter(mask).get_track_paths(), db.get_track_paths()[::2])
+
+    def test_queries(self):
+        file = os.path.abspath("test/data/database_v2_test.bin")
+        self._test_queries(DatabaseV2(file))
+        self._test_queries(DatabaseV2(file, lazy=True))
+        with mock.patch.object(track_table, "_get_numpy", return_value=None):
+            self._test_queries(DatabaseV2(file))
+
+    @unittest.skipUnless(HAS_NUMPY, "numpy not installed")
+    def test_array(self):
+        table = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin")).get_track_table(FIELDS)
+        bpm = table.array(Fields.BPM, float)
+        self.assertEqual(bpm.tolist(), [float(v) for v in table.column(Fields.BPM)])
+        fast = table.filter(bpm > 80)
+        self.assertEqual(fast.column(Fields.BPM), [v for v in table.column(Fields.BPM) if float(v) > 80])
+
+    def test_set_values(self):
+        file = os.path.abspath("test/data/database_v2_test.bin")
+        db = DatabaseV2(file)
+        table = db.get_track_table(FIELDS)
+
+        table.where(Fields.KEY, lambda key: key == "2A").set_values(Fields.GROUPING, ["2A!", "2A!"])
+        expected = DatabaseV2(file)
+        expected.modify_tracks(
+            lambda track: track.set_value(Fields.GROUPING, "2A!") or track if track.tkey == "2A" else track
+        )
+        self.assertEqual(db.entries, expected.entries)
+        self.assertEqual(db.raw_data, expected.raw_data)
@@ -0,0 +1,91 @@
+import unittest
+import os
+import tempfile
+
+from src.serato_tools.database_v2 import DatabaseV2
+from src.serato_tools.crate import Crate
+from src.serato_tools.usb_export import ExportPlan
+from src.serato_tools.utils.export_manifest import ExportManifest
+from src.serato_tools.utils import SERATO_DIR_NAME
+
+
+class TestCase(unittest.TestCase):
+    def test_export_plan(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            serato_dir = os.path.join(tmp_dir, SERATO_DIR_NAME)
+            os.makedirs(os.path.join(serato_dir, os.path.dirname(Crate.SERATO_STEMS_CRATE_PATH)))
+            track_files = [os.path.join(tmp_dir, *f.split("/")) for f in ["Music/a.mp3", "Music/b.mp3", "Other/a.mp3"]]
+            track_files.append(os.path.join(tmp_dir, "Music", "not exported.mp3"))
+            stems_file = os.path.join(tmp_dir, "Music", "a.serato-stems")
+            for f in [*track_files, stems_file]:
+                os.makedirs(os.path.dirname(f), exist_ok=True)
+                with open(f, "wb") as fp:
+                    fp.write(os.path.basename(f).encode())
+
+            db = DatabaseV2(os.path.abspath("test/data/database_v2_test.bin"))
+            track_iter = iter(track_files)
+            db.modify_tracks(lambda track: track.set_path(next(track_iter)) or track)
+            db.save(os.path.join(serato_dir, DatabaseV2.FILENAME))
+            crate_files = []
+            for name, tracks in [("X", track_files[:2]), ("Y", [track_files[2], track_files[1]])]:
+                crate = Crate(os.path.join(serato_dir, Crate.DIR, f"{name}.crate"))
+                for track_file in tracks:
+                    crate.add_track(track_file)
+                crate.save()
+                crate_files.append(crate.filepath)
+            stems_crate = Crate(os.path.join(serato_dir, Crate.SERATO_STEMS_CRATE_PATH))
+            stems_crate.add_track(track_files[0])
+            stems_crate.add_track(track_files[3])
+            stems_crate.save()
+            with open(os.path.join(serato_dir, ExportPlan.NEW_ORDER_FILE), "w", encoding="utf-8") as f:
+                f.write("[crate]X\n[crate]Y\n")
+
+            plan = ExportPlan(crate_files, "Tracks", root_crate="Root", serato_dir=serato_dir)
+            self.assertEqual(list(plan.tracks), ["a.mp3", "b.mp3"], "first track of each filename")
+            self.assertEqual(
+                plan.files,
+                [
+                    (track_files[0], os.path.join("Tracks", "a.mp3")),
+                    (stems_file, os.path.join("Tracks", "a.serato-stems")),
+                    (track_files[1], os.path.join("Tracks", "b.mp3")),
+                ],
+            )
+            self.assertEqual(plan.db.get_track_paths(), ["Tracks/a.mp3", "Tracks/b.mp3"])
+
+            drive_dir = os.path.join(tmp_dir, "drive")
+            data_files = plan.get_data_files()
+            for path, data in data_files.items():
+                os.makedirs(os.path.dirname(os.path.join(drive_dir, path)), exist_ok=True)
+                with open(os.path.join(drive_dir, path), "wb") as f:
+                    f.write(data)
+            crate_dir = os.path.join(SERATO_DIR_NAME, Crate.DIR)
+            self.assertEqual(
+                {
+                    os.path.relpath(path, crate_dir): Crate(os.path.join(drive_dir, path)).get_track_paths()
+                    for path in plan.crates
+                },
+                {
+                    "Root%%X.crate": ["Tracks/a.mp3", "Tracks/b.mp3"],
+                    "Root%%Y.crate": ["Tracks/a.mp3", "Tracks/b.mp3"],
+                    os.path.join("Serato Stems", "Stems.crate"): ["Tracks/a.mp3"],
+                },
+            )
+            order_file = os.path.join(SERATO_DIR_NAME, ExportPlan.NEW_ORDER_FILE)
+            self.assertIn(b"[crate]Root%%X", data_files[order_file])
+
+            manifest = ExportManifest(drive_dir, os.path.join(drive_dir, SERATO_DIR_NAME), load=False)
+            changes = plan.get_changes(drive_dir, manifest, data_files)
+            self.assertEqual(len(changes["write"]), len(data_files), "not in the manifest")
+            self.assertEqual(changes["copy"], [(src, os.path.join(drive_dir, dest)) for src, dest in plan.files])
+            self.assertEqual(changes["copy_bytes"], sum(os.path.getsize(src) for src, _ in plan.files))
+            self.assertEqual(changes["delete"], [])
+            self.assertIn("copy 3 files", plan.describe(changes))
+
+            for path, data in changes["write"].items():
+                manifest.write_data_file(path, data)
+            for src, dest in changes["copy"]:
+                manifest.add_file(src, dest, changes["stats"][src])
+            self.assertEqual(plan.get_changes(drive_dir, manifest, data_files)["write"], {})
+            self.assertEqual(
+                plan.get_changes(drive_dir, manifest, data_files)["copy"], changes["copy"], "not copied to the drive"
+            )